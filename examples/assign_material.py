@@ -10,8 +10,7 @@ ground = environment.link(hlbpy.mesh.Cuboid((6, 3, 0.2)))
 ground.location = (2, 0, -0.1)
 
 for i in range(5):
-    marble = marbles.link(hlbpy.mesh.UVSphere(radius=0.4))
-    marble.shade_smooth()
+    marble = marbles.link(hlbpy.mesh.UVSphere(radius=0.4, smooth=True))
     marble.location = (i, 0, 0.4)
 
     red_material = hlbpy.material.PrincipledBSDF(name="Red", srgb=(200, 0, 0))
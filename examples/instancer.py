@@ -0,0 +1,21 @@
+import hlbpy
+import numpy as np
+
+hlbpy.run_in_blender()
+
+scene = hlbpy.Scene.from_context()
+marbles = scene.link(hlbpy.Collection("Marbles"))
+
+n_marbles = 100000
+rng = np.random.default_rng(0)
+locations = rng.uniform(-10, 10, (n_marbles, 3))
+colors = np.column_stack((rng.uniform(0, 1, (n_marbles, 3)), np.ones(n_marbles)))
+
+marble = hlbpy.mesh.UVSphere(u_segments=8, v_segments=4, radius=0.05, smooth=True)
+marble.material = hlbpy.material.PrincipledBSDF(name="Marble").use_instance_color()
+
+instancer = marbles.link(hlbpy.Instancer(marble, locations, scales=1, colors=colors))
+
+frames = np.arange(0, 101, 10)
+falling = locations[np.newaxis] - np.outer(frames / 100, [0, 0, 5])[:, np.newaxis]
+instancer.cache_frames(frames, locations=falling)
@@ -0,0 +1,19 @@
+import hlbpy
+from hlbpy.directions import *
+from math import pi
+
+hlbpy.run_in_blender()
+
+scene = hlbpy.Scene.from_context()
+
+spheres = scene.link(hlbpy.Collection("Spheres"))
+labels = scene.link(hlbpy.Collection("Labels"))
+
+for i in range(12):
+    spheres.link(hlbpy.mesh.UVSphere(radius=0.5 + 0.1 * i))
+    label = labels.link(hlbpy.special.Tex(str(i)))
+    label.rotation_euler = (pi / 2, 0, 0)
+
+with hlbpy.Layout() as layout:
+    layout.grid(spheres, n_columns=4, buff=0.5, row_direction=IN)
+    layout.next_to(labels, spheres.objects, UP, buff=0.1)
@@ -23,4 +23,11 @@ if inside_blender:
     from .scene import *
     from .external import tex
     from .directions import *
+    from .animation import animation_batch, shared_actions, deduplicate_actions
+    from .base import deferred_updates
+    from .layout import Layout
+    from .base_object import reparent, wrap, get_object, lightweight_objects
+    from .deletion import delete_objects, delete_all
+    from .instancer import Instancer
+    from . import detail
 
@@ -0,0 +1,297 @@
+import bpy
+import hashlib
+import numpy as np
+from contextlib import contextmanager
+from . import keyframes
+
+# one dict {pointer: datablock} per active shared_actions block
+_sharing_scopes = []
+
+
+def ensure_action(datablock):
+    """
+    Make sure the datablock (object, material, shape keys, ...) has an action and return it.
+    An action that was shared by deduplicate_actions is copied first, so the other users stay unchanged.
+    """
+    _record_for_sharing(datablock)
+    if datablock.animation_data is None:
+        datablock.animation_data_create()
+    action = datablock.animation_data.action
+    if action is None:
+        action = bpy.data.actions.new(datablock.name + "_act")
+        datablock.animation_data.action = action
+    elif action.users > 1 and action.get("hlbpy_shared"):
+        action = action.copy()
+        del action["hlbpy_shared"]
+        datablock.animation_data.action = action
+    return action
+
+
+# action key -> {(data_path, array_index): position of the F-curve in action.fcurves}
+# Positions instead of F-curves are cached, since an F-curve removed outside of hlbpy would leave a dangling pointer.
+_fcurve_indices = {}
+
+
+def _action_key(action):
+    return action.as_pointer(), getattr(action, "session_uid", None)
+
+
+def _prune_fcurve_indices():
+    """
+    Forget the indices of actions that were removed outside of hlbpy.
+    """
+    existing = {_action_key(action) for action in bpy.data.actions}
+    for key in [key for key in _fcurve_indices if key not in existing]:
+        del _fcurve_indices[key]
+
+
+def fcurve_index(action):
+    """
+    Returns a dict mapping (data_path, array_index) to the position of the F-curve in action.fcurves.
+    The index is cached per action (see find_fcurve).
+    """
+    key = _action_key(action)
+    index_map = _fcurve_indices.get(key)
+    if index_map is None:
+        if len(_fcurve_indices) >= 2 * len(bpy.data.actions) + 16:
+            _prune_fcurve_indices()
+        index_map = {(fcurve.data_path, fcurve.array_index): i for i, fcurve in enumerate(action.fcurves)}
+        _fcurve_indices[key] = index_map
+    return index_map
+
+
+def invalidate_fcurve_index(action=None):
+    """
+    Forget the cached F-curve index of an action or of all actions if None.
+    """
+    if action is None:
+        _fcurve_indices.clear()
+    else:
+        _fcurve_indices.pop(_action_key(action), None)
+
+
+def find_fcurve(action, data_path, index=0):
+    """
+    Same as action.fcurves.find but uses the cached F-curve index.
+    If F-curves were added or removed outside of hlbpy, the cached position does not match anymore
+    and the index is rebuilt.
+    """
+    fcurves = action.fcurves
+    position = fcurve_index(action).get((data_path, index))
+    if position is not None and position < len(fcurves):
+        fcurve = fcurves[position]
+        if fcurve.data_path == data_path and fcurve.array_index == index:
+            return fcurve
+    fcurve = fcurves.find(data_path, index=index)
+    if fcurve is not None or position is not None:
+        # the cached index is outdated
+        invalidate_fcurve_index(action)
+    return fcurve
+
+
+def ensure_fcurve(action, data_path, index=0):
+    fcurve = find_fcurve(action, data_path, index)
+    if fcurve is None:
+        fcurve = action.fcurves.new(data_path, index=index)
+        # new F-curves are appended, if not, the position is corrected by find_fcurve
+        fcurve_index(action)[(data_path, index)] = len(action.fcurves) - 1
+    return fcurve
+
+
+def write_fcurve_keyframes(datablock, data_path, index, chunks, samples_range=None):
+    """
+    Merge keyframes into the F-curve of a datablock and write them in one bulk pass.
+    Args:
+        datablock: any animatable bpy ID e.g. an object, a material or shape keys
+        data_path: e.g. "location"
+        index: array index e.g. 2 for the z component of the location
+        chunks: list of (keyframe dict, on_collision) tuples in the order they were set
+                (see keyframes.build_keyframes and keyframes.merge_keyframes)
+        samples_range: if given (start, stop), the F-curve is converted into samples in this frame range
+
+    Returns:
+        the F-curve
+    """
+    fcurve = ensure_fcurve(ensure_action(datablock), data_path, index)
+    keys = keyframes.read_keyframes(fcurve)
+    policies = {on_collision for _, on_collision in chunks}
+    if len(policies) == 1:
+        keys = keyframes.combine_keyframes([keys] + [new_keys for new_keys, _ in chunks], policies.pop())
+    else:
+        for new_keys, on_collision in chunks:
+            keys = keyframes.merge_keyframes(keys, new_keys, on_collision)
+    keyframes.write_keyframes(fcurve, keys)
+    if samples_range is not None:
+        fcurve.convert_to_samples(*samples_range)
+    return fcurve
+
+
+def insert_keyframes(datablock, data_path, index, keys, on_collision="replace", samples_range=None):
+    """
+    Write keyframes into the F-curve of a datablock (see write_fcurve_keyframes).
+    If an animation_batch is active, the keyframes are only collected and written when the batch ends.
+    Returns:
+        the F-curve or None if the keyframes were collected
+    """
+    if AnimationBatch.active is not None:
+        AnimationBatch.active.add(datablock, data_path, index, keys, on_collision, samples_range)
+        return None
+    return write_fcurve_keyframes(datablock, data_path, index, [(keys, on_collision)], samples_range)
+
+
+def insert_interleaved_keyframes(datablock, data_path, index, co, interpolation="LINEAR", on_collision="replace",
+                                 samples_range=None):
+    """
+    Insert keyframes given as (frame, value) pairs (see keyframes.iter_channels).
+    F-curves without keyframes are filled directly from co, otherwise the keyframes are merged (see insert_keyframes).
+    Returns:
+        the F-curve or None if the keyframes were collected by an animation_batch
+    """
+    if AnimationBatch.active is None:
+        action = ensure_action(datablock)
+        fcurve = find_fcurve(action, data_path, index)
+        if fcurve is None or len(fcurve.keyframe_points) == 0:
+            fcurve = ensure_fcurve(action, data_path, index)
+            keyframes.write_new_keyframes(
+                fcurve, co, keyframes.as_enum_array(interpolation, keyframes.INTERPOLATION_MODES, len(co)))
+            if samples_range is not None:
+                fcurve.convert_to_samples(*samples_range)
+            return fcurve
+    keys = keyframes.build_keyframes(co[:, 0], co[:, 1], interpolation)
+    return insert_keyframes(datablock, data_path, index, keys, on_collision, samples_range)
+
+
+class AnimationBatch:
+    """
+    Collects keyframes of any number of F-curves and writes every F-curve only once.
+    Use it via the animation_batch context manager.
+    """
+    active = None
+
+    def __init__(self):
+        self.buffers = {}
+        self.after_flush = []
+
+    def add(self, datablock, data_path, index, keys, on_collision="replace", samples_range=None):
+        _record_for_sharing(datablock)
+        key = (datablock.as_pointer(), data_path, index)
+        if key not in self.buffers:
+            self.buffers[key] = {"datablock": datablock, "chunks": [], "samples_range": None}
+        buffer = self.buffers[key]
+        buffer["chunks"].append((keys, on_collision))
+        if samples_range is not None:
+            buffer["samples_range"] = samples_range
+
+    def flush(self):
+        """
+        Write all collected keyframes. Returns the number of F-curves written.
+        """
+        for (_, data_path, index), buffer in self.buffers.items():
+            write_fcurve_keyframes(buffer["datablock"], data_path, index, buffer["chunks"], buffer["samples_range"])
+        n_fcurves = len(self.buffers)
+        self.buffers = {}
+        for callback in self.after_flush:
+            callback()
+        self.after_flush = []
+        return n_fcurves
+
+
+@contextmanager
+def animation_batch():
+    """
+    Collect all keyframes that are set within the with-block and write them when the block is left.
+    Every F-curve is created or extended only once with bulk foreach_set calls.
+
+    Example:
+        with hlbpy.animation_batch():
+            for obj in objects:
+                obj.hide_until(10)
+
+    Nested batches are merged into the outermost one.
+    """
+    if AnimationBatch.active is not None:
+        yield AnimationBatch.active
+        return
+
+    batch = AnimationBatch()
+    AnimationBatch.active = batch
+    try:
+        yield batch
+    finally:
+        AnimationBatch.active = None
+    batch.flush()
+
+
+def _record_for_sharing(datablock):
+    for scope in _sharing_scopes:
+        scope[datablock.as_pointer()] = datablock
+
+
+def action_hash(action):
+    """
+    Hash of everything that determines the animation of an action: its ID type, the F-curve paths and all keyframes.
+    Returns None for actions with F-curve modifiers, which are not compared.
+    """
+    digest = hashlib.sha1(action.id_root.encode())
+    for fcurve in sorted(action.fcurves, key=lambda f: (f.data_path, f.array_index)):
+        if len(fcurve.modifiers):
+            return None
+        digest.update(f"{fcurve.data_path}[{fcurve.array_index}]{fcurve.extrapolation}{fcurve.mute}".encode())
+        keys = keyframes.read_keyframes(fcurve)
+        for name in keyframes.KEYFRAME_PROPERTIES:
+            digest.update(keys[name].tobytes())
+        sampled_points = np.empty(len(fcurve.sampled_points) * 2, dtype=np.float32)
+        fcurve.sampled_points.foreach_get("co", sampled_points)
+        digest.update(sampled_points.tobytes())
+    return digest.hexdigest()
+
+
+def deduplicate_actions(datablocks):
+    """
+    Let all datablocks whose actions have exactly the same content share one action.
+    Actions that are not used anymore are removed.
+    If hlbpy sets keyframes on a datablock with a shared action later on, the action is copied first.
+    Args:
+        datablocks: bpy datablocks or high level objects e.g. a Collection
+
+    Returns:
+        number of removed actions
+    """
+    shared = {}
+    replaced = {}
+    for datablock in datablocks:
+        datablock = getattr(datablock, "bpy_object", datablock)
+        animation_data = datablock.animation_data
+        if animation_data is None or animation_data.action is None:
+            continue
+        action = animation_data.action
+        content_hash = action_hash(action)
+        if content_hash is None:
+            continue
+        shared_action = shared.setdefault(content_hash, action)
+        if shared_action != action:
+            animation_data.action = shared_action
+            shared_action["hlbpy_shared"] = True
+            replaced[action.as_pointer()] = action
+    unused = [action for action in replaced.values() if action.users == 0]
+    for action in unused:
+        invalidate_fcurve_index(action)
+    bpy.data.batch_remove(unused)
+    return len(unused)
+
+
+@contextmanager
+def shared_actions():
+    """
+    All datablocks that get keyframes within the with-block share their actions if the content is identical
+    (see deduplicate_actions). Keyframes are collected in an animation_batch, so the actions are compared after
+    their final keyframes have been written.
+    """
+    datablocks = {}
+    _sharing_scopes.append(datablocks)
+    try:
+        with animation_batch() as batch:
+            batch.after_flush.append(lambda: deduplicate_actions(list(datablocks.values())))
+            yield
+    finally:
+        _sharing_scopes.remove(datablocks)
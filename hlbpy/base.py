@@ -1,9 +1,15 @@
 import bpy
 import numpy as np
+from contextlib import contextmanager
+from . import keyframes
+from . import animation
+from .simplify import fit_bezier_keyframes
 
 
 class HighLevelBase:
-    if "all_hlbpy_objects" in [s.name for s in bpy.data.scenes]:
+    __slots__ = ("bpy_object", "__weakref__")
+
+    if bpy.data.scenes.get("all_hlbpy_objects") is not None:
         all_hlbpy_objects_scene = bpy.data.scenes["all_hlbpy_objects"]
         objects = all_hlbpy_objects_scene.collection.objects
         while objects:
@@ -11,6 +17,12 @@ class HighLevelBase:
     else:
         all_hlbpy_objects_scene = bpy.data.scenes.new("all_hlbpy_objects")
 
+    # pointers of bpy objects that changed since the last update
+    _dirty_objects = set()
+    _n_deferring_blocks = 0
+    # incremented by update(), cached matrices and bounds of an older epoch are outdated
+    _update_epoch = 0
+
     def __init__(self, name):
         self.bpy_object = None
 
@@ -40,53 +52,98 @@ class HighLevelBase:
     def update():
         """
         update blender stuff. For example dimensions or bound_box are recalculated
+        All cached matrices and bounds are dropped, so changes hlbpy can't see (frame_set, in-place edits like
+        obj.location.z += 1 or edits of bpy_object) are picked up.
         """
+        HighLevelBase._update_epoch += 1
+        HighLevelBase._update_view_layers()
+
+    @staticmethod
+    def _update_view_layers():
         for view_layer in HighLevelBase.all_hlbpy_objects_scene.view_layers:
             view_layer.update()
+        HighLevelBase._dirty_objects.clear()
+
+    def mark_dirty(self):
+        """
+        Remember that blender has to re-evaluate this object before its bounds or matrices are read again.
+        """
+        HighLevelBase._dirty_objects.add(self.bpy_object.as_pointer())
+
+    @staticmethod
+    def update_if_dirty(bpy_objects):
+        """
+        Update only if any of the given bpy objects changed since the last update.
+        Nothing happens within a deferred_updates block.
+        """
+        dirty_objects = HighLevelBase._dirty_objects
+        if HighLevelBase._n_deferring_blocks or not dirty_objects:
+            return
+        if any(bpy_object.as_pointer() in dirty_objects for bpy_object in bpy_objects):
+            # the caches of the changed objects were already dropped by mark_dirty
+            HighLevelBase._update_view_layers()
 
     def set_up_animation_data(self):
-        if self.bpy_object.animation_data is None:
-            self.bpy_object.animation_data_create()
-        if self.bpy_object.animation_data.action is None:
-            action = bpy.data.actions.new(self.bpy_object.name + "_act")
-            self.bpy_object.animation_data.action = action
+        return animation.ensure_action(self.bpy_object)
 
     def set_keyframes(self, attribute, values, frame_numbers=None, index=None, as_samples=False,
                       interpolation_mode="LINEAR",
-                      bezier_handles_left=None, bezier_handles_right=None):
+                      bezier_handles_left=None, bezier_handles_right=None, on_collision="replace", simplify=None,
+                      easing=None, amplitude=None, period=None, back=None, handle_left_type=None,
+                      handle_right_type=None):
         """
         Set a whole array of keyframes at once.
+        If the F-curve already has keyframes, the old and new keyframes are merged and written back in one pass.
+        Within an animation_batch, the keyframes are collected and written when the batch ends.
         Args:
             bpy_object: bpy object
             attribute: specify which type of keyframe to set. e.g. "location" or "rotation_euler"...
             values: array of coordinates e.g. [[x1, y1, z1], [x2, y2, z2], ...]
+                    For long animations also a np.memmap or the path of a .npy file, which are copied chunk by
+                    chunk into one (frame, value) buffer per F-curve, or an iterator over chunks of coordinates,
+                    which are first collected into one float32 array (see keyframes.iter_channels).
+                    This only holds for F-curves without keyframes outside of an animation_batch. Otherwise full
+                    keyframe dicts with all keyframe properties are built for merging, which need several times
+                    the memory of the values.
             frame_numbers: List of frame numbers. If None frame numbers 0,1,2,3.. will be used.
             index: indoex of attribute e.g. for location: 0 for x 1 for y ...
+                   or a list with one index per attribute dimension in values e.g. [0, 2] for x and z
             as_samples: If True: Converts the keyframes into samples. (no interpolation between keyframes)
-            interpolation_mode: "CONSTANT", "LINEAR", or "BEZIER"
-                                (Warning: If bezier handles are not set, all handles are at (0,0))
+            interpolation_mode: "CONSTANT", "LINEAR", "BEZIER", "ELASTIC", ... or one mode per keyframe
+                                (If bezier handles are not set, they are calculated automatically)
             bezier_handles_left: coordinates of the left bezier handle relative to the keyframe coordinate.
                                  shape: (n_keyframes, n_attribute_dimensions, handle_xy)
             bezier_handles_right: equivalent to bezier_handles_left
+            on_collision: what to do with existing keyframes on the same frames as new ones.
+                          "replace", "keep" or "error" (see keyframes.merge_keyframes)
+            simplify: If given, the values are treated as dense samples and approximated with as few bezier
+                      keyframes as possible, such that no sample deviates more than simplify from the F-curve.
+                      interpolation_mode, bezier handles and the following keyframe properties are ignored in
+                      this case.
+            easing: "AUTO", "EASE_IN", "EASE_OUT" or "EASE_IN_OUT"
+            amplitude: amplitude of "ELASTIC" interpolation
+            period: period of "ELASTIC" interpolation
+            back: overshoot of "BACK" interpolation
+            handle_left_type: "FREE", "AUTO", "VECTOR", "ALIGNED" or "AUTO_CLAMPED"
+            handle_right_type: equivalent to handle_left_type
+            interpolation_mode and all keyframe properties from easing on can be given as single value,
+            with one value per keyframe, or with shape (n_keyframes, n_attribute_dimensions).
 
         Returns:
-
+            If simplify is given: compression ratio i.e. number of samples / number of keyframes written
         """
-        assert isinstance(interpolation_mode, str)
-        interpolation_mode_number = {"CONSTANT": 0, "LINEAR": 1, "BEZIER": 2}[interpolation_mode]
-
-        values = np.array(values)
-        if values.ndim == 1:
-            values = np.expand_dims(values, axis=1)
-        self.set_up_animation_data()
-
-        n_frames = values.shape[0]
-
-        if frame_numbers is None:
-            frame_numbers = np.arange(n_frames)
-
-        for i in range(values.shape[1]):
-            if values.shape[1] > 1:
+        key_properties = {"easing": easing, "amplitude": amplitude, "period": period, "back": back,
+                          "handle_left_type": handle_left_type, "handle_right_type": handle_right_type}
+        key_properties = {name: value for name, value in key_properties.items() if value is not None}
+        use_interleaved = simplify is None and bezier_handles_left is None and bezier_handles_right is None and \
+            not key_properties
+
+        n_samples = 0
+        n_keyframes = 0
+        for i, n_dimensions, co in keyframes.iter_channels(values, frame_numbers):
+            if np.ndim(index) == 1:
+                index_to_use = index[i]
+            elif n_dimensions > 1:
                 index_to_use = i
             else:
                 if index is not None:
@@ -95,41 +152,70 @@ class HighLevelBase:
                 else:
                     index_to_use = 0
 
-            fcurve = self.bpy_object.animation_data.action.fcurves.find(attribute, index=index_to_use)
+            samples_range = (0, len(co)) if as_samples else None
+            interpolation = keyframes.select_channel(interpolation_mode, i)
+            n_samples += len(co)
+            if use_interleaved:
+                animation.insert_interleaved_keyframes(self.bpy_object, attribute, index_to_use, co, interpolation,
+                                                       on_collision, samples_range)
+                continue
+
+            if simplify is None:
+                new_keys = keyframes.build_keyframes(
+                    co[:, 0], co[:, 1], interpolation,
+                    handles_left=None if bezier_handles_left is None else np.array(bezier_handles_left)[:, i, :],
+                    handles_right=None if bezier_handles_right is None else np.array(bezier_handles_right)[:, i, :],
+                    **{name: keyframes.select_channel(value, i) for name, value in key_properties.items()})
+            else:
+                key_frames, key_values, handles_left, handles_right = fit_bezier_keyframes(co[:, 0], co[:, 1],
+                                                                                           simplify)
+                new_keys = keyframes.build_keyframes(key_frames, key_values, "BEZIER", handles_left, handles_right)
+            n_keyframes += len(new_keys["co"])
+            animation.insert_keyframes(self.bpy_object, attribute, index_to_use, new_keys, on_collision, samples_range)
+
+        if simplify is not None:
+            return n_samples / n_keyframes
 
-            if not fcurve:
-                fcurve = self.bpy_object.animation_data.action.fcurves.new(attribute, index=index_to_use)
+    def set_keyframe(self, attribute, value, frame_number, index=0, interpolation=None, **key_properties):
+        """
+        Set a single keyframe.
+        Outside of an animation_batch the keyframe is inserted directly with keyframe_points.insert, which is cheap for
+        a single key. Within a batch it is collected and merged with the other keyframes of the F-curve.
+        Args:
+            attribute: e.g. "location"
+            value: value of the attribute component
+            frame_number:
+            index: index of attribute component
+            interpolation: interpolation mode. If None, "BEZIER" is used
+            **key_properties: further keyframe properties e.g. amplitude=0.5 (see keyframes.build_keyframes)
 
-                fcurve.keyframe_points.add(n_frames)
-                frame_data = np.column_stack((frame_numbers, values[:, i]))
-                fcurve.keyframe_points.foreach_set("co", frame_data.flatten())
-                fcurve.keyframe_points.foreach_set("interpolation", [interpolation_mode_number] * n_frames)
-                if interpolation_mode == "BEZIER":
-                    if bezier_handles_left is not None:
-                        bezier_handles_left_i = frame_data + np.array(bezier_handles_left)[:, i, :]
-                        fcurve.keyframe_points.foreach_set("handle_left", bezier_handles_left_i.flatten())
-                    if bezier_handles_right is not None:
-                        bezier_handles_right_i = frame_data + np.array(bezier_handles_right)[:, i, :]
-                        fcurve.keyframe_points.foreach_set("handle_right", bezier_handles_right_i.flatten())
+        Returns:
+            The keyframe point or None within an animation_batch.
+            Warning! The keyframe point is only valid until another keyframe has been created
+            see https://developer.blender.org/T83044
+        """
+        if animation.AnimationBatch.active is not None:
+            keys = keyframes.build_keyframes([frame_number], [value], interpolation or "BEZIER", **key_properties)
+            animation.insert_keyframes(self.bpy_object, attribute, index, keys)
+            return None
 
-            else:
-                for frame_number, value in zip(frame_numbers, values[:, i]):
-                    key_frame = fcurve.keyframe_points.insert(frame_number, value, options={"FAST"})
-                    key_frame.interpolation = interpolation_mode
-                    if interpolation_mode == "BEZIER":
-                        raise NotImplementedError("inserting bezier keyframes to existing kurve not implemented yet")
-
-            if as_samples:
-                fcurve.convert_to_samples(0, n_frames)
-
-    def set_keyframe(self, attribute, value, frame_number, index=0, interpolation=None):
-        self.set_up_animation_data()
-        fcurve = self.bpy_object.animation_data.action.fcurves.find(attribute, index=index)
-        if not fcurve:
-            fcurve = self.bpy_object.animation_data.action.fcurves.new(attribute, index=index)
+        fcurve = animation.ensure_fcurve(self.set_up_animation_data(), attribute, index)
         key_frame = fcurve.keyframe_points.insert(frame_number, value, options={"FAST"})
-        if interpolation:
-            key_frame.interpolation = interpolation
+        key_frame.interpolation = interpolation or "BEZIER"
+        for name, property_value in key_properties.items():
+            if property_value is not None:
+                setattr(key_frame, name, property_value)
         return key_frame
-        # Warning! key_frame is only valid until another keyframe has been created
-        # see https://developer.blender.org/T83044
+
+
+@contextmanager
+def deferred_updates():
+    """
+    Suppress all view layer updates within the with-block e.g. while constructing many objects.
+    Bounds and matrices read within the block may be outdated. They are updated on the first read after the block.
+    """
+    HighLevelBase._n_deferring_blocks += 1
+    try:
+        yield
+    finally:
+        HighLevelBase._n_deferring_blocks -= 1
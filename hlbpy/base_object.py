@@ -1,23 +1,153 @@
+from contextlib import contextmanager
 from .base import HighLevelBase
 from .directions import *
 from mathutils import Vector
 from .misc import apply_material_to_obj, get_bpy_obj
 from .transitions import Transitions
+from . import registry
+from .deletion import delete_objects
+from .evaluation import animated_matrix_local, animated_matrix_world, transform_points
 import bpy
 from mathutils import Matrix, Vector
 
 
+def bound_point(min_point, max_point, direction):
+    """
+    Select the point of an axis aligned box in a direction e.g. UP or (1, 0, -1).
+    Broadcasts over leading dimensions of min_point, max_point and direction.
+    """
+    direction = np.asarray(direction)
+    return np.where(direction > 0, max_point, np.where(direction < 0, min_point, (min_point + max_point) / 2))
+
+
+class ChildIndex:
+    """
+    Insertion ordered set of children with O(1) append, remove and membership tests.
+    Positional access like children[0] uses a list that is only rebuilt after the children changed.
+    Iterating yields a snapshot, so the children can be reparented while iterating.
+    """
+
+    def __init__(self, children=()):
+        self._children = dict.fromkeys(children)
+        self._list = None
+
+    def as_list(self):
+        if self._list is None:
+            self._list = list(self._children)
+        return self._list
+
+    def append(self, child):
+        self._children.pop(child, None)
+        self._children[child] = None
+        self._list = None
+
+    def extend(self, children):
+        for child in children:
+            self.append(child)
+
+    def remove(self, child):
+        try:
+            del self._children[child]
+        except KeyError:
+            raise ValueError(f"{child} is not a child") from None
+        self._list = None
+
+    def __contains__(self, child):
+        return child in self._children
+
+    def __len__(self):
+        return len(self._children)
+
+    def __iter__(self):
+        return iter(self.as_list())
+
+    def __getitem__(self, key):
+        return self.as_list()[key]
+
+    def __setitem__(self, key, value):
+        children = list(self.as_list())
+        children[key] = value
+        self._children = dict.fromkeys(children)
+        self._list = None
+
+    def __repr__(self):
+        return f"ChildIndex({self.as_list()})"
+
+
 class HighLevelObject(HighLevelBase):
-    def __init__(self, bpy_object, no_update=False):
+    # subclasses without __slots__ get a __dict__ as usual
+    __slots__ = ("_children", "_linked_collections", "_transitions", "_parent", "_material", "_local_box",
+                 "_subtree_box", "_matrix_local", "_matrix_world", "_in_global_scene", "_cache_epoch")
+
+    # incremented on every transform change, cached world matrices of an older epoch are outdated
+    _transform_epoch = 0
+    # default of the lightweight argument, set by lightweight_objects
+    _lightweight_default = False
+
+    def __init__(self, bpy_object, no_update=False, lightweight=None, created=True):
+        """
+        Args:
+            bpy_object: the wrapped blender object
+            no_update: don't mark the object as changed
+            lightweight: don't link the object into the all_hlbpy_objects scene, which is needed to evaluate bounds,
+                         until the first bound query. Useful for many objects whose bounds are never needed.
+                         If None, the default set by lightweight_objects is used.
+            created: the bpy object was created by hlbpy. False for wrappers of existing objects, which are not
+                     removed by deletion.delete_all.
+        """
         self.bpy_object = bpy_object
-        self.children = []
-        self.linked_collections = []
+        # children, linked_collections and transitions are created on first use
+        self._children = None
+        self._linked_collections = None
+        self._transitions = None
         self._parent = None
         self._material = None
-        self.transitions = Transitions(self)
-        HighLevelBase.all_hlbpy_objects_scene.collection.objects.link(self.bpy_object)
+        self._local_box = None
+        self._subtree_box = None
+        self._matrix_local = None
+        self._matrix_world = (-1, None)
+        self._in_global_scene = False
+        self._cache_epoch = HighLevelBase._update_epoch
+        if lightweight is None:
+            lightweight = HighLevelObject._lightweight_default
+        if not lightweight:
+            self.link_to_global_scene()
+        registry.register(self)
+        if created:
+            registry.mark_created(bpy_object)
         if not no_update:
-            self.update()
+            self.mark_dirty()
+
+    def link_to_global_scene(self):
+        """
+        Link the object into the all_hlbpy_objects scene, where its bounds are evaluated.
+        """
+        if self._in_global_scene:
+            return
+        try:
+            HighLevelBase.all_hlbpy_objects_scene.collection.objects.link(self.bpy_object)
+        except RuntimeError:
+            # already linked by another wrapper
+            pass
+        self._in_global_scene = True
+
+    @property
+    def children(self):
+        if self._children is None:
+            self._children = ChildIndex()
+        return self._children
+
+    @property
+    def linked_collections(self):
+        if self._linked_collections is None:
+            self._linked_collections = []
+        return self._linked_collections
+
+    @property
+    def transitions(self):
+        if self._transitions is None:
+            self._transitions = Transitions(self)
+        return self._transitions
 
     def __getitem__(self, key):
         return self.children[key]
@@ -26,7 +156,10 @@ class HighLevelObject(HighLevelBase):
         self.children[key] = value
 
     def __len__(self):
-        return len(self.children)
+        return 0 if self._children is None else len(self._children)
+
+    def __iter__(self):
+        return iter(()) if self._children is None else iter(self._children)
 
     @property
     def center(self):
@@ -63,7 +196,7 @@ class HighLevelObject(HighLevelBase):
     @location.setter
     def location(self, value):
         self.bpy_object.location = value
-        self.update()
+        self.invalidate_transform()
 
     @property
     def name(self):
@@ -80,7 +213,7 @@ class HighLevelObject(HighLevelBase):
     @rotation_euler.setter
     def rotation_euler(self, value):
         self.bpy_object.rotation_euler = value
-        self.update()
+        self.invalidate_transform()
 
     @property
     def scale(self):
@@ -94,7 +227,7 @@ class HighLevelObject(HighLevelBase):
             self.bpy_object.scale = [value] * 3
         else:
             self.bpy_object.scale = value
-        self.update()
+        self.invalidate_transform()
 
     @property
     def parent(self):
@@ -102,11 +235,7 @@ class HighLevelObject(HighLevelBase):
 
     @parent.setter
     def parent(self, parent):
-        if self._parent:
-            self._parent.children.remove(self)
-        self._parent = parent
-        self.bpy_object.parent = parent.bpy_object
-        parent.children.append(self)
+        reparent([self], parent)
 
     @property
     def material(self):
@@ -114,6 +243,14 @@ class HighLevelObject(HighLevelBase):
 
     @material.setter
     def material(self, value):
+        data = self.bpy_object.data
+        if data is not None and data.users > 1:
+            if self.bpy_object.material_slots:
+                # linked copies share the data, so the material is linked to the existing slot of the object instead
+                self.bpy_object.material_slots[self.bpy_object.active_material_index].link = "OBJECT"
+            else:
+                # adding a slot would add it to all objects sharing the data
+                self.ensure_own_data()
         self.bpy_object.active_material = value.bpy_object
         self._material = value
 
@@ -125,53 +262,263 @@ class HighLevelObject(HighLevelBase):
     def get_bound(self, direction):
         return self.get_own_bound(direction)
 
-    def get_own_bound(self, direction, in_global_space=False):
-        center = (np.array(self.bpy_object.bound_box[6]) + np.array(self.bpy_object.bound_box[0])) * \
-                 self.bpy_object.scale / 2
-        result = Vector((0, 0, 0))
-        for i, d in enumerate(direction):
-            if d == 0:
-                result[i] = center[i]
-            elif d > 0:
-                result[i] = self.bpy_object.bound_box[6][i]
+    def ensure_updated(self, include_descendants=False):
+        """
+        Update if this object, one of its parents or (optionally) one of its descendants changed since the last update.
+        """
+        if not HighLevelBase._dirty_objects:
+            return
+        bpy_objects = [self.bpy_object]
+        parent = self.bpy_object.parent
+        while parent is not None:
+            bpy_objects.append(parent)
+            parent = parent.parent
+        if include_descendants:
+            bpy_objects.extend(descendant.bpy_object for descendant in self.descendants())
+        self.update_if_dirty(bpy_objects)
+
+    def mark_dirty(self):
+        """
+        Remember that the geometry of this object changed, so blender has to re-evaluate it before its bounds are read.
+        """
+        super().mark_dirty()
+        self._local_box = None
+        self._invalidate_boxes_upwards()
+
+    def invalidate_transform(self):
+        """
+        Forget the cached matrices after location, rotation, scale or parent of this object changed.
+        Cached world matrices of all other objects are invalidated as well, since they might be descendants.
+        """
+        self._matrix_local = None
+        HighLevelObject._transform_epoch += 1
+        if self._parent is not None:
+            self._parent._invalidate_boxes_upwards()
+
+    def _check_cache_epoch(self):
+        """
+        Drop cached matrices and boxes if HighLevelBase.update was called since they were cached.
+        """
+        if self._cache_epoch != HighLevelBase._update_epoch:
+            self._cache_epoch = HighLevelBase._update_epoch
+            self._matrix_local = None
+            self._matrix_world = (-1, None)
+            self._local_box = None
+            self._subtree_box = None
+
+    def _invalidate_boxes_upwards(self):
+        obj = self
+        while obj is not None:
+            obj._subtree_box = None
+            obj = obj._parent
+
+    def get_matrix(self, in_global_space=False):
+        """
+        Returns the local (relative to the parent) or world matrix as numpy array of shape (4, 4).
+        The matrices are cached and calculated from location, rotation, scale and the parent chain,
+        so no view layer update is needed. Constraints and drivers are not taken into account.
+        After changes that bypass hlbpy (e.g. frame_set or obj.location.z += 1) call update().
+        """
+        self._check_cache_epoch()
+        if self._matrix_local is None:
+            self._matrix_local = np.array(self.bpy_object.matrix_parent_inverse) @ \
+                                 np.array(self.bpy_object.matrix_basis)
+        if not in_global_space:
+            return self._matrix_local
+
+        epoch, matrix_world = self._matrix_world
+        if epoch != HighLevelObject._transform_epoch:
+            bpy_parent = self.bpy_object.parent
+            if bpy_parent is None:
+                matrix_world = self._matrix_local
+            elif self._parent is not None and self._parent.bpy_object == bpy_parent:
+                matrix_world = self._parent.get_matrix(in_global_space=True) @ self._matrix_local
+            elif registry.lookup(bpy_parent) is not None:
+                # parented outside of hlbpy, bpy_parent.matrix_world might be outdated
+                matrix_world = registry.lookup(bpy_parent).get_matrix(in_global_space=True) @ self._matrix_local
             else:
-                result[i] = self.bpy_object.bound_box[0][i]
-        if in_global_space:
-            return np.array(self.bpy_object.matrix_world @ result)
+                matrix_world = np.array(bpy_parent.matrix_world) @ self._matrix_local
+            self._matrix_world = (HighLevelObject._transform_epoch, matrix_world)
+        return matrix_world
+
+    def get_local_box(self):
+        """
+        Returns the corners (min_point, max_point) of the bounding box in object space.
+        The box is cached until the geometry of the object changes (see mark_dirty) or update is called.
+        """
+        self._check_cache_epoch()
+        if self._local_box is not None:
+            return self._local_box
+        if not self._in_global_scene:
+            self.link_to_global_scene()
+            self.mark_dirty()
+        self.ensure_updated()
+        corners = np.array(self.bpy_object.bound_box)
+        local_box = (corners.min(axis=0), corners.max(axis=0))
+        if self.bpy_object.as_pointer() not in HighLevelBase._dirty_objects:
+            self._local_box = local_box
+        return local_box
+
+    def get_anchors(self, directions=ALL_DIRECTIONS, in_global_space=False):
+        """
+        Get many anchor points (like left, top, ...) of the object at once.
+        Args:
+            directions: array of shape (n_directions, 3) e.g. [UP, LEFT + DOWN]. By default all 27 anchors.
+            in_global_space: If False, the anchors are given in the space of the parent.
+
+        Returns:
+            array of shape (n_directions, 3)
+        """
+        min_point, max_point = self.get_local_box()
+        points = bound_point(min_point, max_point, np.asarray(directions, dtype=float))
+        return transform_points(self.get_matrix(in_global_space), points)
+
+    def get_own_bound(self, direction, in_global_space=False):
+        return self.get_anchors([direction], in_global_space)[0]
+
+    def get_box(self, in_global_space=False):
+        """
+        Returns the corners (min_point, max_point) of the axis aligned box around the object
+        in the space of the parent or in global space.
+        """
+        return self._transformed_box(self.get_local_box(), in_global_space)
+
+    def get_children_box(self, in_global_space=False):
+        """
+        Same as get_box but around all descendants (see get_subtree_box).
+        """
+        return self._transformed_box(self.get_subtree_box(), in_global_space)
+
+    def _transformed_box(self, box, in_global_space):
+        corners = transform_points(self.get_matrix(in_global_space),
+                                   bound_point(box[0], box[1], ALL_DIRECTIONS[CORNER_INDICES]))
+        return corners.min(axis=0), corners.max(axis=0)
+
+    def get_subtree_box(self):
+        """
+        Returns the corners (min_point, max_point) of the box around the geometry of all descendants
+        (children, grandchildren, ...) in the object space of this object. Empties are only used as points if there is
+        no geometry at all.
+        The matrices of each hierarchy level are composed at once and all boxes are transformed in one go.
+        The result is cached until a descendant is moved, reparented or changes its geometry or update is called.
+        """
+        self._check_cache_epoch()
+        if self._subtree_box is not None:
+            return self._subtree_box
+        if not len(self):
+            raise ValueError(f"{self.name} has no children")
+
+        nodes = list(self)
+        matrices = np.array([child.get_matrix() for child in nodes])
+        all_nodes = []
+        all_matrices = []
+        while nodes:
+            all_nodes.extend(nodes)
+            all_matrices.append(matrices)
+            next_nodes = []
+            parent_indices = []
+            for i, node in enumerate(nodes):
+                for child in node:
+                    next_nodes.append(child)
+                    parent_indices.append(i)
+            if next_nodes:
+                matrices = matrices[parent_indices] @ np.array([child.get_matrix() for child in next_nodes])
+            nodes = next_nodes
+        matrices = np.concatenate(all_matrices)
+
+        has_geometry = np.array([node.bpy_object.type != "EMPTY" for node in all_nodes])
+        if np.any(has_geometry):
+            boxes = np.array([node.get_local_box() for node, geometry in zip(all_nodes, has_geometry) if geometry])
+            corners = bound_point(boxes[:, np.newaxis, 0], boxes[:, np.newaxis, 1], ALL_DIRECTIONS[CORNER_INDICES])
+            points = transform_points(matrices[has_geometry][:, np.newaxis], corners).reshape(-1, 3)
         else:
-            return np.array(self.bpy_object.matrix_local @ result)
+            points = matrices[:, :3, 3]
+        self._subtree_box = (points.min(axis=0), points.max(axis=0))
+        return self._subtree_box
 
     def get_children_bound(self, direction, in_global_space=False):
-        child_box_corners = np.array([child.matrix_local @ Vector(corner) for child in self.bpy_object.children
-                                      for corner in child.bound_box])
-        max_point = np.max(child_box_corners, axis=0)
-        min_point = np.min(child_box_corners, axis=0)
-        center = (min_point + max_point) / 2
-        result = Vector((0, 0, 0))
-        for i, d in enumerate(direction):
-            if d == 0:
-                result[i] = center[i]
-            elif d > 0:
-                result[i] = max_point[i]
-            else:
-                result[i] = min_point[i]
+        min_point, max_point = self.get_subtree_box()
+        point = bound_point(min_point, max_point, np.asarray(direction, dtype=float))
+        return transform_points(self.get_matrix(in_global_space), point)
+
+    def get_animated_matrix(self, frames, in_global_space=False):
+        """
+        Evaluate the local or world matrix at many frames at once from the keyframes without calling frame_set.
+        Returns:
+            array of shape (n_frames, 4, 4)
+        """
         if in_global_space:
-            return np.array(self.bpy_object.matrix_global @ result)
+            return animated_matrix_world(self.bpy_object, frames)
+        return animated_matrix_local(self.bpy_object, frames)
+
+    def get_animated_bound(self, direction, frames, in_global_space=False):
+        """
+        Like get_bound but evaluated at many frames at once from the keyframes without calling frame_set.
+        e.g. obj.get_animated_bound(UP, np.arange(600)) gives the top of the object in frames 0 to 599.
+        Returns:
+            array of shape (n_frames, 3)
+        """
+        return self.get_own_animated_bound(direction, frames, in_global_space)
+
+    def get_own_animated_bound(self, direction, frames, in_global_space=False):
+        min_point, max_point = self.get_local_box()
+        point = bound_point(min_point, max_point, direction)
+        return transform_points(self.get_animated_matrix(frames, in_global_space), point)
+
+    def get_animated_children_bound(self, direction, frames, in_global_space=False):
+        """
+        Like get_children_bound but evaluated at many frames at once from the keyframes without calling frame_set.
+        The animated matrices of each hierarchy level are composed at once, like in get_subtree_box.
+        Returns:
+            array of shape (n_frames, 3)
+        """
+        if not len(self):
+            raise ValueError(f"{self.name} has no children")
+
+        nodes = list(self)
+        # shape: (n_nodes, n_frames, 4, 4)
+        matrices = np.array([animated_matrix_local(child.bpy_object, frames) for child in nodes])
+        all_nodes = []
+        all_matrices = []
+        while nodes:
+            all_nodes.extend(nodes)
+            all_matrices.append(matrices)
+            next_nodes = []
+            parent_indices = []
+            for i, node in enumerate(nodes):
+                for child in node:
+                    next_nodes.append(child)
+                    parent_indices.append(i)
+            if next_nodes:
+                matrices = matrices[parent_indices] @ np.array([animated_matrix_local(child.bpy_object, frames)
+                                                                for child in next_nodes])
+            nodes = next_nodes
+        matrices = np.concatenate(all_matrices)
+
+        has_geometry = np.array([node.bpy_object.type != "EMPTY" for node in all_nodes])
+        if np.any(has_geometry):
+            boxes = np.array([node.get_local_box() for node, geometry in zip(all_nodes, has_geometry) if geometry])
+            corners = bound_point(boxes[:, np.newaxis, 0], boxes[:, np.newaxis, 1], ALL_DIRECTIONS[CORNER_INDICES])
+            # shape: (n_frames, n_nodes * 8, 3)
+            points = transform_points(matrices[has_geometry][:, :, np.newaxis], corners[:, np.newaxis])
+            points = points.swapaxes(0, 1).reshape(points.shape[1], -1, 3)
         else:
-            return np.array(self.bpy_object.matrix_local @ result)
+            points = matrices[:, :, :3, 3].transpose(1, 0, 2)
+        point = bound_point(points.min(axis=1), points.max(axis=1), np.asarray(direction, dtype=float))
+        return transform_points(self.get_animated_matrix(frames, in_global_space), point)
 
     def get_children_center(self):
         return self.get_children_bound([0, 0, 0])
 
     def move_children(self, vector):
-        for child in self.bpy_object.children:
-            child.location += Vector(vector)
+        for child in self:
+            child.bpy_object.location += Vector(vector)
+            child.invalidate_transform()
         return self
 
     def align_children(self, direction):
-        if self.children:
+        if len(self):
             self.move_children(-self.get_children_bound(direction))
-            self.update()
         return self
 
     def to_local(self, vector):
@@ -179,46 +526,119 @@ class HighLevelObject(HighLevelBase):
         Returns corresponding vector in local space i.e. the internal space of the parent
         If no parent is present, local space is equal to global space.
         Args:
-            vector:
+            vector: point in the space of this object of shape (3,) or many points of shape (..., 3)
 
-        Returns:
+        Returns: numpy array of the same shape
 
         """
-        return np.array(self.bpy_object.matrix_local @ Vector(vector))
+        return transform_points(self.get_matrix(), vector)
 
     def to_global(self, vector):
         """
         Returns corresponding vector in global space.
+        All points are transformed with one matmul using the cached world matrix (see get_matrix).
         Args:
-            vector:
+            vector: point in the space of this object of shape (3,) or many points of shape (..., 3)
 
-        Returns:
+        Returns: numpy array of the same shape
 
         """
-        return np.array(self.bpy_object.matrix_world @ Vector(vector))
+        return transform_points(self.get_matrix(in_global_space=True), vector)
 
-    def hide_until(self, frame, recursively=True):
+    def from_global(self, vector):
+        """
+        Inverse of to_global: returns the point(s) of shape (3,) or (..., 3) given in global space
+        in the space of this object.
+        """
+        return transform_points(np.linalg.inv(self.get_matrix(in_global_space=True)), vector)
+
+    def hide_until(self, frame, recursively=True, shared=False):
+        """
+        Hide the object until the given frame.
+        Args:
+            frame:
+            recursively: Also hide all descendants.
+            shared: Only set keyframes on this object and let all descendants follow its visibility via drivers.
+                    The drivers are only created once per descendant, so every further reveal of the hierarchy
+                    costs two F-curves regardless of the number of descendants.
+        """
         self.set_keyframes("hide_viewport", [1, 0], [frame - 1, frame], interpolation_mode="CONSTANT")
         self.set_keyframes("hide_render", [1, 0], [frame - 1, frame], interpolation_mode="CONSTANT")
         if recursively:
-            for child in self:
-                child.hide_until(frame)
+            if shared:
+                self.share_visibility()
+            else:
+                for child in self:
+                    child.hide_until(frame)
 
-    def hide_from(self, frame, recursively=True):
+    def hide_from(self, frame, recursively=True, shared=False):
+        """
+        Hide the object from the given frame on. See hide_until for the arguments.
+        """
         self.set_keyframes("hide_viewport", [0, 1], [frame, frame + 1], interpolation_mode="CONSTANT")
         self.set_keyframes("hide_render", [0, 1], [frame, frame + 1], interpolation_mode="CONSTANT")
         if recursively:
-            for child in self:
-                child.hide_from(frame)
+            if shared:
+                self.share_visibility()
+            else:
+                for child in self:
+                    child.hide_from(frame)
 
-    def delete(self):
-        if self._parent:
-            self._parent.children.remove(self)
-            bpy.data.objects.remove(self.bpy_object)
+    def share_visibility(self):
+        """
+        Let all descendants follow hide_viewport and hide_render of this object via drivers.
+        A descendant is hidden if any of the objects whose visibility it shares is hidden.
+        Warning: the drivers override keyframes on hide_viewport and hide_render of the descendants.
+        """
+        for descendant in self.descendants():
+            bpy_object = descendant.bpy_object
+            for attribute in ("hide_viewport", "hide_render"):
+                fcurve = None
+                if bpy_object.animation_data is not None:
+                    fcurve = bpy_object.animation_data.drivers.find(attribute)
+                if fcurve is None:
+                    fcurve = bpy_object.driver_add(attribute)
+                    fcurve.driver.type = "MAX"
+                elif any(variable.targets[0].id == self.bpy_object for variable in fcurve.driver.variables):
+                    continue
+                variable = fcurve.driver.variables.new()
+                variable.type = "SINGLE_PROP"
+                variable.targets[0].id = self.bpy_object
+                variable.targets[0].data_path = attribute
+
+    def descendants(self):
+        """
+        Iterate over all children, grandchildren, ... depth first.
+        """
+        for child in self:
+            yield child
+            yield from child.descendants()
 
-    def copy(self, liked=False, link_to_same_collections=True):
+    def delete(self, recursively=True):
+        """
+        Delete the object (and by default all its descendants) together with its data, materials and actions if
+        nothing else uses them. Everything is removed with one batch_remove call (see deletion.delete_objects).
+        Returns:
+            dict with the number of removed datablocks per type and the estimated freed memory in bytes
+        """
+        return delete_objects([self], recursively)
+
+    def copy(self, linked=True, link_to_same_collections=True, liked=None):
+        """
+        Copy the object.
+        Args:
+            linked: If True, the copy shares the data (mesh, curve, ...) with this object. hlbpy copies the data
+                    automatically before it changes the geometry of one of them (see ensure_own_data).
+            link_to_same_collections: link the copy to all collections this object is linked to
+            liked: old name of linked
+
+        Returns:
+            the copy
+        """
+        if liked is not None:
+            linked = liked
         bpy_object_copy = self.bpy_object.copy()
-        if not liked:
+        if not linked and self.bpy_object.data is not None:
             bpy_object_copy.data = self.bpy_object.data.copy()
 
         c = type(self)(bpy_object=bpy_object_copy)
@@ -227,8 +647,177 @@ class HighLevelObject(HighLevelBase):
                 collection.link(c)
         return c
 
+    def ensure_own_data(self):
+        """
+        Copy on write: give the object its own copy of its data if the data is shared with other objects
+        (e.g. after copy). Must be called before the data of the object is changed.
+        Returns:
+            the data of the object
+        """
+        data = self.bpy_object.data
+        if data is not None and data.users > 1:
+            data = data.copy()
+            # shared primitive meshes have a fake user, their copies don't need one
+            data.use_fake_user = False
+            self.bpy_object.data = data
+            self.mark_dirty()
+        return data
+
     def origin_to(self, location):
+        self.ensure_own_data()
         self.bpy_object.data.transform(Matrix.Translation(-location))
-        matrix_world = self.bpy_object.matrix_world
-        matrix_world.translation = matrix_world @ Vector(location)
-        self.update()
+        self.bpy_object.location += self.bpy_object.matrix_basis.to_3x3() @ Vector(location)
+        self.mark_dirty()
+        self.invalidate_transform()
+
+
+@contextmanager
+def lightweight_objects(lightweight=True):
+    """
+    Create all objects within the with-block as lightweight objects (see HighLevelObject), including objects that
+    are created internally like the glyphs of a Tex or the ticks of an Axis.
+
+    Example:
+        with hlbpy.lightweight_objects():
+            marbles = [UVSphere(radius=0.05, location=location) for location in locations]
+    """
+    previous = HighLevelObject._lightweight_default
+    HighLevelObject._lightweight_default = lightweight
+    try:
+        yield
+    finally:
+        HighLevelObject._lightweight_default = previous
+
+
+def wrap(bpy_object):
+    """
+    Returns the high level object of a bpy object. A plain lightweight HighLevelObject is only created if the bpy
+    object has no wrapper yet, so every bpy object is wrapped at most once.
+    """
+    wrapper = registry.lookup(bpy_object)
+    if wrapper is None:
+        wrapper = HighLevelObject(bpy_object, lightweight=True, created=False)
+    return wrapper
+
+
+def get_object(name):
+    """
+    Returns the high level object of the bpy object with the given name (see wrap) or None if there is no such object.
+    """
+    bpy_object = bpy.data.objects.get(name)
+    return None if bpy_object is None else wrap(bpy_object)
+
+
+def reparent(children, new_parent, keep_transform=False):
+    """
+    Give many objects a new parent in one pass. The high level and the blender hierarchy are both updated.
+    Args:
+        children: list of high level objects
+        new_parent: high level object or None to remove the parent
+        keep_transform: If True, matrix_parent_inverse is set so that the objects stay where they are in global space
+                        (calculated for all objects at once). If False, location, rotation and scale are interpreted
+                        relative to the new parent, like setting obj.parent.
+    """
+    children = list(children)
+    if keep_transform:
+        matrices_world = np.array([child.get_matrix(in_global_space=True) for child in children]).reshape(-1, 4, 4)
+        matrices_basis = np.array([child.bpy_object.matrix_basis for child in children]).reshape(-1, 4, 4)
+        parent_world = np.eye(4) if new_parent is None else new_parent.get_matrix(in_global_space=True)
+        parent_inverses = np.linalg.inv(parent_world) @ matrices_world @ np.linalg.inv(matrices_basis)
+
+    old_parents = {}
+    new_bpy_parent = None if new_parent is None else new_parent.bpy_object
+    for i, child in enumerate(children):
+        old_parent = child._parent
+        if old_parent is not None:
+            old_parent.children.remove(child)
+            old_parents[old_parent] = None
+        child._parent = new_parent
+        child.bpy_object.parent = new_bpy_parent
+        if keep_transform:
+            child.bpy_object.matrix_parent_inverse = Matrix(parent_inverses[i].tolist())
+        if new_parent is not None:
+            new_parent.children.append(child)
+        child._matrix_local = None
+
+    for old_parent in old_parents:
+        old_parent._invalidate_boxes_upwards()
+    if new_parent is not None:
+        new_parent._invalidate_boxes_upwards()
+    HighLevelObject._transform_epoch += 1
+
+
+TRANSFORM_ATTRIBUTES = ("location", "rotation_euler", "scale")
+
+
+def _foreach_get(bpy_collection, attribute):
+    buffer = np.empty(len(bpy_collection) * 3, dtype=np.float32)
+    bpy_collection.foreach_get(attribute, buffer)
+    return buffer.reshape(-1, 3)
+
+
+def _collection_rows(objects, bpy_collection):
+    """
+    Returns the positions of the objects in bpy_collection or None if bpy_collection is None or does not contain
+    all objects.
+    """
+    if bpy_collection is None:
+        return None
+    positions = {bpy_object.as_pointer(): i for i, bpy_object in enumerate(bpy_collection)}
+    rows = [positions.get(obj.bpy_object.as_pointer()) for obj in objects]
+    if None in rows:
+        return None
+    return np.array(rows, dtype=int)
+
+
+def get_transforms(objects, bpy_collection=None):
+    """
+    Read location, rotation_euler and scale of many objects.
+    Args:
+        objects: list of high level objects
+        bpy_collection: optional bpy collection that contains all objects e.g. the objects of a bpy collection.
+                        If given, every attribute is read with one foreach_get.
+
+    Returns:
+        locations, rotations, scales as arrays of shape (n_objects, 3) each
+    """
+    rows = _collection_rows(objects, bpy_collection)
+    if rows is None:
+        return tuple(np.array([getattr(obj.bpy_object, attribute) for obj in objects], dtype=float).reshape(-1, 3)
+                     for attribute in TRANSFORM_ATTRIBUTES)
+    return tuple(_foreach_get(bpy_collection, attribute)[rows].astype(float) for attribute in TRANSFORM_ATTRIBUTES)
+
+
+def set_transforms(objects, locations=None, rotations=None, scales=None, bpy_collection=None):
+    """
+    Set location, rotation_euler and scale of many objects and update blender once afterwards
+    (not within a deferred_updates block).
+    Args:
+        objects: list of high level objects
+        locations: array of shape (n_objects, 3) or (3,) for all objects. None leaves the locations unchanged.
+        rotations: euler angles, equivalent to locations
+        scales: equivalent to locations
+        bpy_collection: optional bpy collection that contains all objects. If given, every attribute is written with
+                        one foreach_get and one foreach_set. Otherwise the attributes are set object by object since
+                        blender has no bulk access to arbitrary sets of objects.
+    """
+    rows = _collection_rows(objects, bpy_collection)
+    for attribute, values in zip(TRANSFORM_ATTRIBUTES, (locations, rotations, scales)):
+        if values is None:
+            continue
+        values = np.broadcast_to(np.asarray(values, dtype=np.float32), (len(objects), 3))
+        if rows is None:
+            for obj, value in zip(objects, values):
+                setattr(obj.bpy_object, attribute, value)
+        else:
+            buffer = _foreach_get(bpy_collection, attribute)
+            buffer[rows] = values
+            bpy_collection.foreach_set(attribute, buffer.ravel())
+
+    for obj in objects:
+        if rows is not None:
+            # foreach_set does not tag the objects for re-evaluation
+            obj.bpy_object.update_tag(refresh={"OBJECT"})
+        obj.invalidate_transform()
+    if not HighLevelBase._n_deferring_blocks:
+        HighLevelBase._update_view_layers()
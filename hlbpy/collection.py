@@ -1,30 +1,67 @@
 import bpy
+import numpy as np
 from .base import HighLevelBase
-from .base_object import HighLevelObject
+from .base_object import get_transforms, set_transforms, wrap
+from . import registry
+from .deletion import delete_datablocks
+from . import animation
+from . import keyframes
 
 
 class Collection(HighLevelBase):
     def __init__(self, name="Collection", bpy_object=None, reuse=True, clear=False):
-        self.objects = []
+        self._objects = []
+        self._objects_to_wrap = None
         self.objects_in_hierarchy = []
 
         if bpy_object is None:
-            already_present = name in [c.name for c in bpy.data.collections]
+            present = bpy.data.collections.get(name)
+            already_present = present is not None
             if reuse and already_present:
-                self.bpy_object = bpy.data.collections[name]
+                self.bpy_object = present
                 if not clear:
-                    for obj in self.bpy_object.objects:
-                        self.objects.append(HighLevelObject(obj, no_update=True))
-                    self.update()
+                    # existing objects are wrapped when collection.objects is used for the first time
+                    self._objects_to_wrap = list(self.bpy_object.objects)
             else:
                 self.bpy_object = bpy.data.collections.new(name)
 
             if already_present and clear:
-                while self.bpy_object.objects:
-                    bpy.data.objects.remove(self.bpy_object.objects[0])
+                delete_datablocks(list(self.bpy_object.objects))
 
         else:
             self.bpy_object = bpy_object
+        registry.register(self)
+
+    @property
+    def objects(self):
+        if self._objects_to_wrap is not None:
+            wrapped = [wrap(obj) for obj in self._objects_to_wrap]
+            for obj in wrapped:
+                if self not in obj.linked_collections:
+                    obj.linked_collections.append(self)
+            self._objects = wrapped + self._objects
+            self._objects_to_wrap = None
+        return self._objects
+
+    def forget(self, removed):
+        """
+        Drop deleted high level objects from this collection.
+        Args:
+            removed: set or dict of high level objects
+        """
+        self._objects = [obj for obj in self._objects if obj not in removed]
+        self.objects_in_hierarchy = [obj for obj in self.objects_in_hierarchy if obj not in removed]
+        if self._objects_to_wrap is not None:
+            removed_bpy_objects = {obj.bpy_object for obj in removed}
+            self._objects_to_wrap = [obj for obj in self._objects_to_wrap if obj not in removed_bpy_objects]
+
+    def get_object(self, name):
+        """
+        Returns the high level object with the given name if it is in this collection, otherwise None.
+        Only this object is wrapped, even if the other objects of a reused collection have not been wrapped yet.
+        """
+        bpy_object = self.bpy_object.objects.get(name)
+        return None if bpy_object is None else wrap(bpy_object)
 
     def link(self, obj, hierarchically=True, is_child=False):
         try:
@@ -39,7 +76,7 @@ class Collection(HighLevelBase):
                 self.bpy_object.children.link(bpy_object)
         else:
             if not is_child:
-                self.objects.append(obj)
+                self._objects.append(obj)
             self.objects_in_hierarchy.append(obj)
             self.bpy_object.objects.link(obj.bpy_object)
             obj.linked_collections.append(self)
@@ -49,6 +86,71 @@ class Collection(HighLevelBase):
                     self.link(child, hierarchically, is_child=True)
         return obj
 
+    def set_keyframes(self, attribute, values, frame_numbers=None, index=None, interpolation_mode="LINEAR",
+                      on_collision="replace", **key_properties):
+        """
+        Set keyframes for all objects of the collection at once.
+        All (frame, value) pairs are interleaved into one contiguous buffer and every F-curve is written
+        from a view into this buffer.
+        Args:
+            attribute: e.g. "location"
+            values: array of shape (n_objects, n_frames, n_attribute_dimensions) or (n_objects, n_frames)
+                    The order of the objects is the order of collection.objects.
+            frame_numbers: List of frame numbers. If None frame numbers 0,1,2,3.. will be used.
+            index: index of attribute if values has only one attribute dimension
+            interpolation_mode: "CONSTANT", "LINEAR", "BEZIER", ... or a list with one mode per frame
+            on_collision: see HighLevelBase.set_keyframes
+            **key_properties: per keyframe properties like easing, amplitude or period as single value or with one
+                              value per frame (see HighLevelBase.set_keyframes)
+
+        Returns:
+
+        """
+        key_properties = {name: value for name, value in key_properties.items() if value is not None}
+        values = np.asarray(values, dtype=np.float32)
+        if values.ndim == 2:
+            values = values[:, :, np.newaxis]
+        n_objects, n_frames, n_dimensions = values.shape
+        if n_objects != len(self.objects):
+            raise ValueError(f"values contains data for {n_objects} objects but the collection has "
+                             f"{len(self.objects)} objects")
+        if frame_numbers is None:
+            frame_numbers = np.arange(n_frames)
+        array_indices = range(n_dimensions) if n_dimensions > 1 else [index or 0]
+
+        buffer = np.empty((n_objects, n_dimensions, n_frames, 2), dtype=np.float32)
+        buffer[..., 0] = frame_numbers
+        buffer[..., 1] = values.transpose(0, 2, 1)
+        interpolation = np.ascontiguousarray(
+            keyframes.as_enum_array(interpolation_mode, keyframes.INTERPOLATION_MODES, n_frames))
+
+        for obj, object_buffer in zip(self.objects, buffer):
+            for channel_buffer, array_index in zip(object_buffer, array_indices):
+                if key_properties:
+                    keys = keyframes.build_keyframes(channel_buffer[:, 0], channel_buffer[:, 1], interpolation,
+                                                     **key_properties)
+                    animation.insert_keyframes(obj.bpy_object, attribute, array_index, keys, on_collision)
+                else:
+                    animation.insert_interleaved_keyframes(obj.bpy_object, attribute, array_index, channel_buffer,
+                                                           interpolation, on_collision)
+
+    def get_transforms(self):
+        """
+        Returns locations, rotations (euler angles) and scales of all objects as arrays of shape (n_objects, 3) each.
+        The order of the objects is the order of collection.objects.
+        """
+        return get_transforms(self.objects, self.bpy_object.objects)
+
+    def set_transforms(self, locations=None, rotations=None, scales=None):
+        """
+        Set the transforms of all objects at once with one foreach_set per attribute and a single update.
+        Args:
+            locations: array of shape (n_objects, 3) or (3,) for all objects. None leaves the locations unchanged.
+            rotations: euler angles, equivalent to locations
+            scales: equivalent to locations
+        """
+        set_transforms(self.objects, locations, rotations, scales, self.bpy_object.objects)
+
     def __len__(self):
         return len(self.objects)
 
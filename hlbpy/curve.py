@@ -2,20 +2,28 @@ import bpy
 import numpy as np
 from math import pi
 from .external.curve_assign_shapekey import main as curve_transform
+from .base import HighLevelBase
 from .base_object import HighLevelObject
+from .animation import insert_keyframes
+from .keyframes import build_keyframes
+from . import detail
 
 
 class Text(HighLevelObject):
-    def __init__(self, content, name):
+    __slots__ = ()
+
+    def __init__(self, content, name, lightweight=None):
         curve = bpy.data.curves.new(type="FONT", name=name)
         bpy_object = bpy.data.objects.new(name, curve)
         bpy_object.data.body = content
-        super().__init__(bpy_object)
+        super().__init__(bpy_object, lightweight=lightweight)
 
 
 class Curve(HighLevelObject):
+    __slots__ = ("_bevel_object",)
+
     def __init__(self, vertices=None, spline_type="POLY", name="Curve", bevel_object=None, bpy_object=None,
-                 bezier_handle_type="AUTO"):
+                 bezier_handle_type="AUTO", resolution=None, lightweight=None):
         """
 
         Args:
@@ -23,6 +31,9 @@ class Curve(HighLevelObject):
             spline_type: chose any from: "POLY", "BEZIER", or "NURBS"
             name:
             bevel_object:
+            resolution: resolution_u of a curve created from vertices. If None, it is chosen by the detail policy
+                        (see adapt_resolution).
+            lightweight: see HighLevelObject
         """
 
         if vertices is not None and bpy_object is None:
@@ -58,8 +69,41 @@ class Curve(HighLevelObject):
         else:
             raise ValueError("one of vertices and bpy_object has to be given")
 
-        super().__init__(bpy_object)
+        super().__init__(bpy_object, lightweight=lightweight)
         self._bevel_object = bevel_object
+        if vertices is not None:
+            if resolution is None:
+                self.adapt_resolution()
+            else:
+                self.bpy_object.data.resolution_u = resolution
+
+    def control_points(self):
+        """
+        Returns the coordinates of all control points of all splines in object space. shape: (n_points, 3)
+        """
+        coordinates = [np.zeros((0, 3))]
+        for spline in self.bpy_object.data.splines:
+            bezier_points = np.empty(len(spline.bezier_points) * 3, dtype=np.float32)
+            spline.bezier_points.foreach_get("co", bezier_points)
+            points = np.empty(len(spline.points) * 4, dtype=np.float32)
+            spline.points.foreach_get("co", points)
+            coordinates += [bezier_points.reshape(-1, 3), points.reshape(-1, 4)[:, :3]]
+        return np.concatenate(coordinates)
+
+    def adapt_resolution(self, policy=None):
+        """
+        Set resolution_u according to the size of the curve in world space and, depending on the policy,
+        the distance to the camera (see detail.DetailPolicy.curve_resolution).
+        The size is estimated from the control points, so the curve does not have to be evaluated.
+        The resolution is a display setting, so it is also changed for other objects that share the curve data.
+        """
+        policy = policy or detail.default_policy
+        points = self.to_global(self.control_points())
+        if len(points):
+            size = np.max(points.max(axis=0) - points.min(axis=0)) / 2
+            self.bpy_object.data.resolution_u = policy.curve_resolution(size, points.mean(axis=0))
+            self.mark_dirty()
+        return self
 
     @property
     def bevel_object(self):
@@ -67,10 +111,12 @@ class Curve(HighLevelObject):
 
     @bevel_object.setter
     def bevel_object(self, value):
+        self.ensure_own_data()
         self.bpy_object.data.bevel_mode = "OBJECT"
         self.bpy_object.data.bevel_object = value.bpy_object
         self._bevel_object = value
         self.shade_smooth = False
+        self.mark_dirty()
 
     @property
     def shade_smooth(self):
@@ -78,6 +124,7 @@ class Curve(HighLevelObject):
 
     @shade_smooth.setter
     def shade_smooth(self, value):
+        self.ensure_own_data()
         self.bpy_object.data.splines[0].use_smooth = value
 
     @property
@@ -87,7 +134,9 @@ class Curve(HighLevelObject):
     @fill_mode.setter
     def fill_mode(self, value):
         """allowed values: "NONE", "BOTH", "BACK", "FRONT" """
+        self.ensure_own_data()
         self.bpy_object.data.fill_mode = value
+        self.mark_dirty()
 
     @property
     def cyclic(self):
@@ -95,7 +144,9 @@ class Curve(HighLevelObject):
 
     @cyclic.setter
     def cyclic(self, value):
+        self.ensure_own_data()
         self.bpy_object.data.splines[0].use_cyclic_u = value
+        self.mark_dirty()
 
     @property
     def extrude(self):
@@ -103,12 +154,18 @@ class Curve(HighLevelObject):
 
     @extrude.setter
     def extrude(self, value):
+        self.ensure_own_data()
         self.bpy_object.data.extrude = value
+        self.mark_dirty()
 
     def transform(self, target, start, stop=None, n_frames=30, hide=True, adjust_spline_number=True):
         if stop is None:
             stop = start + n_frames
 
+        # the spline adjustment and the shape keys change the data of both curves
+        self.ensure_own_data()
+        target.ensure_own_data()
+
         if adjust_spline_number:
             n_target_splines = len(target.bpy_object.data.splines)
             n_own_splines = len(self.bpy_object.data.splines)
@@ -132,7 +189,11 @@ class Curve(HighLevelObject):
                     spline.bezier_points.foreach_set("co", spawn_array)
                     spline.bezier_points.foreach_set("handle_left", spawn_array)
                     spline.bezier_points.foreach_set("handle_right", spawn_array)
+                to_extend.mark_dirty()
 
+        # curve_transform works in world space and reads matrix_world, which location, rotation and scale setters
+        # don't update (see HighLevelObject.invalidate_transform)
+        HighLevelBase._update_view_layers()
         curve_transform(self.bpy_object, [target.bpy_object],
                         removeOriginal=False,
                         space='worldspace',
@@ -142,10 +203,8 @@ class Curve(HighLevelObject):
                         alignValues=['minX', 'maxY', 'minZ'])
 
         key_block = self.bpy_object.data.shape_keys.key_blocks[target.bpy_object.name]
-        key_block.value = 0
-        key_block.keyframe_insert("value", frame=start)
-        key_block.value = 1
-        key_block.keyframe_insert("value", frame=stop)
+        insert_keyframes(self.bpy_object.data.shape_keys, key_block.path_from_id("value"), 0,
+                         build_keyframes([start, stop], [0, 1], "BEZIER"))
 
         if hide:
             self.hide_from(stop)
@@ -153,13 +212,17 @@ class Curve(HighLevelObject):
 
 
 class Line(Curve):
-    def __init__(self, start, stop, name="Line"):
+    __slots__ = ()
+
+    def __init__(self, start, stop, name="Line", lightweight=None):
         vertices = np.stack((start, stop), axis=0)
-        super().__init__(vertices, name=name)
+        super().__init__(vertices, name=name, lightweight=lightweight)
 
 
 class Polygon(Curve):
-    def __init__(self, n_corners, radius=1, spline_type="POLY", name="Polygon"):
+    __slots__ = ()
+
+    def __init__(self, n_corners, radius=1, spline_type="POLY", name="Polygon", lightweight=None):
         """
         Create a polygon shaped curve.
         Args:
@@ -171,36 +234,42 @@ class Polygon(Curve):
         y_values = np.cos(angles) * radius
         z_values = np.zeros(n_corners)
         vertices = np.column_stack((x_values, y_values, z_values))
-        super().__init__(vertices, spline_type, name)
+        super().__init__(vertices, spline_type, name, lightweight=lightweight)
         self.cyclic = True
 
 
 class Rectangle(Curve):
-    def __init__(self, width, height, spline_type="POLY", name="Rectangle"):
+    __slots__ = ()
+
+    def __init__(self, width, height, spline_type="POLY", name="Rectangle", lightweight=None):
         vertices = np.array([[-width / 2, -height / 2, 0],
                              [-width / 2, +height / 2, 0],
                              [+width / 2, +height / 2, 0],
                              [+width / 2, -height / 2, 0]])
-        super().__init__(vertices, spline_type, name)
+        super().__init__(vertices, spline_type, name, lightweight=lightweight)
         self.cyclic = True
 
 
 class Circle(Curve):
-    def __init__(self, radius=1, name="Circle"):
+    __slots__ = ()
+
+    def __init__(self, radius=1, name="Circle", lightweight=None):
         vertices = [[0, -radius, 0],
                     [radius, 0, 0],
                     [0, radius, 0],
                     [-radius, 0, 0]]
-        super().__init__(vertices, spline_type="BEZIER", name=name)
+        super().__init__(vertices, spline_type="BEZIER", name=name, lightweight=lightweight)
         self.cyclic = True
 
 
 class TipTriangle(Curve):
-    def __init__(self, width, length, thickness=0):
+    __slots__ = ()
+
+    def __init__(self, width, length, thickness=0, lightweight=None):
         vertices = np.array([[-width / 2, 0, 0],
                              [0, length, 0],
                              [width / 2, 0, 0]])
-        super().__init__(vertices, name="TipTriangle")
+        super().__init__(vertices, name="TipTriangle", lightweight=lightweight)
         self.fill_mode = "BOTH"
         self.bpy_object.data.extrude = thickness / 2
         self.cyclic = True
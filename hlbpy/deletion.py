@@ -0,0 +1,127 @@
+import bpy
+from . import animation
+from . import registry
+
+# rough sizes in bytes of blender's structs, only used to estimate the freed memory
+ID_SIZE = 1024
+STRUCT_SIZES = {"vertices": 32, "edges": 16, "loops": 16, "polygons": 24, "bezier_points": 72, "points": 40,
+                "keyframe_points": 72, "fcurves": 256}
+
+
+def _owned_datablocks(datablock):
+    """
+    Datablocks that are only referenced via datablock and might become unused if it is removed.
+    """
+    owned = []
+    data = getattr(datablock, "data", None)
+    if isinstance(data, bpy.types.ID):
+        owned.append(data)
+    shape_keys = getattr(datablock, "shape_keys", None)
+    if shape_keys is not None:
+        owned.append(shape_keys)
+    for slot in getattr(datablock, "material_slots", ()):
+        if slot.material is not None:
+            owned.append(slot.material)
+    for material in getattr(datablock, "materials", ()):
+        if material is not None:
+            owned.append(material)
+    animation_data = getattr(datablock, "animation_data", None)
+    if animation_data is not None and animation_data.action is not None:
+        owned.append(animation_data.action)
+    return owned
+
+
+def gather_orphans(bpy_objects):
+    """
+    Find all data (meshes, curves, materials, actions, shape keys, ...) that is not used anymore once the objects
+    are removed. Datablocks with a fake user or a user outside of the removed set are kept.
+    Returns:
+        set of the objects and their orphaned datablocks
+    """
+    to_remove = set(bpy_objects)
+    candidates = set()
+    unvisited = list(to_remove)
+    while unvisited:
+        owned = [datablock for datablock in _owned_datablocks(unvisited.pop()) if datablock not in candidates]
+        candidates.update(owned)
+        unvisited.extend(owned)
+    if not candidates:
+        return to_remove
+
+    user_map = bpy.data.user_map(subset=candidates)
+    while True:
+        orphans = {datablock for datablock, users in user_map.items()
+                   if datablock not in to_remove and not datablock.use_fake_user and users <= to_remove}
+        if not orphans:
+            return to_remove
+        to_remove |= orphans
+
+
+def estimate_size(datablock):
+    """
+    Rough estimate of the memory used by a datablock in bytes (geometry and keyframes).
+    """
+    size = ID_SIZE
+    for attribute in ("vertices", "edges", "loops", "polygons"):
+        size += len(getattr(datablock, attribute, ())) * STRUCT_SIZES[attribute]
+    for spline in getattr(datablock, "splines", ()):
+        size += len(spline.bezier_points) * STRUCT_SIZES["bezier_points"] + len(spline.points) * STRUCT_SIZES["points"]
+    for fcurve in getattr(datablock, "fcurves", ()):
+        size += STRUCT_SIZES["fcurves"] + len(fcurve.keyframe_points) * STRUCT_SIZES["keyframe_points"]
+    return size
+
+
+def delete_datablocks(bpy_objects):
+    """
+    Remove bpy objects and all data that is orphaned by their removal with one bpy.data.batch_remove call.
+    Returns:
+        dict with the number of removed datablocks per type (e.g. "OBJECT", "CURVE", "MATERIAL", "ACTION")
+        and the estimated freed memory in bytes as "estimated_bytes"
+    """
+    to_remove = gather_orphans(bpy_objects)
+    report = {"estimated_bytes": 0}
+    for datablock in to_remove:
+        id_type = datablock.id_type
+        report[id_type] = report.get(id_type, 0) + 1
+        report["estimated_bytes"] += estimate_size(datablock)
+        if id_type == "ACTION":
+            animation.invalidate_fcurve_index(datablock)
+        wrapper = registry.lookup(datablock)
+        if wrapper is not None:
+            registry.unregister(wrapper)
+        registry.forget_created(datablock)
+    bpy.data.batch_remove(to_remove)
+    return report
+
+
+def delete_objects(objects, recursively=True):
+    """
+    Delete high level objects (by default including all their descendants) together with their orphaned data.
+    The objects are removed from their parents and collections and everything is removed in one batch.
+    Returns:
+        see delete_datablocks
+    """
+    removed = {}
+    for obj in objects:
+        removed[obj] = None
+        if recursively:
+            removed.update(dict.fromkeys(obj.descendants()))
+
+    collections = {}
+    for obj in removed:
+        if obj.parent is not None and obj.parent not in removed:
+            obj.parent.children.remove(obj)
+        collections.update(dict.fromkeys(obj.linked_collections))
+    for collection in collections:
+        collection.forget(removed)
+    return delete_datablocks([obj.bpy_object for obj in removed])
+
+
+def delete_all():
+    """
+    Delete all objects hlbpy created in this session and their orphaned data. Existing objects that were only wrapped
+    (e.g. by wrap or Collection(reuse=True)) are kept. Wrappers of deleted objects must not be used anymore.
+    Returns:
+        see delete_datablocks
+    """
+    return delete_datablocks([bpy_object for bpy_object in bpy.data.objects if registry.was_created(bpy_object)])
@@ -0,0 +1,91 @@
+import bpy
+import numpy as np
+from . import registry
+
+
+class DetailPolicy:
+    """
+    Chooses how finely primitives and curves are tessellated depending on their size, so that small objects don't
+    waste triangles and large objects don't look edgy.
+    A circle of radius r approximated with n segments deviates at most about r * pi^2 / (2 n^2) from the true circle,
+    so n is chosen such that this deviation stays below tolerance.
+    If use_camera is True, sizes are scaled by reference_distance / (distance to the active camera), i.e. the
+    tolerance applies to objects at reference_distance from the camera.
+    """
+
+    def __init__(self, tolerance=0.0025, min_segments=8, max_segments=128, min_resolution=1, max_resolution=64,
+                 use_camera=False, reference_distance=10):
+        """
+        Args:
+            tolerance: maximal deviation from the exact surface in blender units (at reference_distance)
+            min_segments: minimal number of segments around a sphere
+            max_segments: maximal number of segments around a sphere
+            min_resolution: minimal resolution_u of curves
+            max_resolution: maximal resolution_u of curves
+            use_camera: take the distance to the active camera into account
+            reference_distance: camera distance at which objects are tessellated according to their size
+        """
+        self.tolerance = tolerance
+        self.min_segments = min_segments
+        self.max_segments = max_segments
+        self.min_resolution = min_resolution
+        self.max_resolution = max_resolution
+        self.use_camera = use_camera
+        self.reference_distance = reference_distance
+
+    def visual_size(self, size, location=None):
+        """
+        Size in world space scaled by the distance to the active camera if use_camera is True and the location is
+        known.
+        """
+        camera = bpy.context.scene.camera
+        if not self.use_camera or location is None or camera is None:
+            return size
+        wrapper = registry.lookup(camera)
+        if wrapper is not None:
+            # matrix_world of a camera moved by hlbpy is only updated with the view layer
+            camera_location = wrapper.get_matrix(in_global_space=True)[:3, 3]
+        else:
+            camera_location = np.array(camera.matrix_world.translation)
+        distance = np.linalg.norm(np.asarray(location) - camera_location)
+        return size * self.reference_distance / max(distance, 1e-6)
+
+    def circle_segments(self, radius, location=None):
+        """
+        Number of segments for a circle of the given radius in world space.
+        """
+        return int(np.clip(self._segments(radius, location), self.min_segments, self.max_segments))
+
+    def _segments(self, radius, location):
+        radius = self.visual_size(radius, location)
+        return int(np.ceil(np.pi * np.sqrt(max(radius, 0) / (2 * self.tolerance))))
+
+    def sphere_segments(self, radius, location=None):
+        """
+        Returns (u_segments, v_segments) for a UV sphere of the given radius in world space.
+        """
+        u_segments = self.circle_segments(radius, location)
+        return u_segments, max(u_segments // 2, 3)
+
+    def curve_resolution(self, size, location=None):
+        """
+        resolution_u for a curve of the given size (half the largest extent) in world space.
+        A bezier circle has 4 segments, each of which is subdivided resolution_u times.
+        """
+        resolution = int(np.ceil(self._segments(size, location) / 4))
+        return int(np.clip(resolution, self.min_resolution, self.max_resolution))
+
+
+default_policy = DetailPolicy()
+
+
+def set_default_policy(policy):
+    """
+    Set the detail policy that is used by primitives and curves if no segment numbers or resolution are given.
+    """
+    global default_policy
+    default_policy = policy
+
+
+def get_default_policy():
+    return default_policy
@@ -1,4 +1,5 @@
 import numpy as np
+from itertools import product as _product
 
 
 CENTER: np.ndarray = np.array((0.0, 0.0, 0.0))
@@ -21,3 +22,9 @@ IN: np.ndarray = np.array((0.0, 1.0, 0.0))
 
 OUT: np.ndarray = np.array((0.0, -1.0, 0.0))
 """One unit step in the positive Y direction."""
+
+ALL_DIRECTIONS: np.ndarray = np.array(list(_product((-1.0, 0.0, 1.0), repeat=3)))
+"""All 27 combinations of -1, 0 and 1 for x, y and z. e.g. for all anchors of a bounding box."""
+
+CORNER_INDICES: np.ndarray = np.flatnonzero(np.all(ALL_DIRECTIONS != 0, axis=1))
+"""Indices of the 8 corner directions in ALL_DIRECTIONS."""
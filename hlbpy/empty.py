@@ -3,8 +3,10 @@ from .base_object import HighLevelObject
 
 
 class Empty(HighLevelObject):
-    def __init__(self, name="Empty"):
+    __slots__ = ()
+
+    def __init__(self, name="Empty", lightweight=None):
         bpy_object = bpy.data.objects.new(name, None)
-        super().__init__(bpy_object, no_update=True)
+        super().__init__(bpy_object, no_update=True, lightweight=lightweight)
 
 
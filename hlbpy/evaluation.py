@@ -0,0 +1,215 @@
+import numpy as np
+from . import keyframes
+from .animation import find_fcurve
+
+INTERPOLATION_MODE_NAMES = {number: name for name, number in keyframes.INTERPOLATION_MODES.items()}
+
+
+def _corrected_bezier_handles(key0, handle0, handle1, key1):
+    """
+    Shorten handles that reach over the neighbouring keyframe like blender does (BKE_fcurve_correct_bezpart),
+    so the x coordinate of the bezier is monotonic. Each handle is clamped to the length of the segment on its own.
+    """
+    h1 = key0 - handle0
+    h2 = key1 - handle1
+    length1 = np.abs(h1[:, 0])
+    length2 = np.abs(h2[:, 0])
+    length = key1[:, 0] - key0[:, 0]
+    factor1 = np.where(length1 > length, length / np.where(length1 > 0, length1, 1), 1)[:, np.newaxis]
+    factor2 = np.where(length2 > length, length / np.where(length2 > 0, length2, 1), 1)[:, np.newaxis]
+    return key0 - factor1 * h1, key1 - factor2 * h2
+
+
+def _evaluate_bezier(key0, handle0, handle1, key1, frames, n_iterations=50):
+    handle0, handle1 = _corrected_bezier_handles(key0, handle0, handle1, key1)
+    lower = np.zeros(len(frames))
+    upper = np.ones(len(frames))
+    for _ in range(n_iterations):
+        u = (lower + upper) / 2
+        v = 1 - u
+        x = v ** 3 * key0[:, 0] + 3 * u * v ** 2 * handle0[:, 0] + 3 * u ** 2 * v * handle1[:, 0] + u ** 3 * key1[:, 0]
+        too_small = x < frames
+        lower = np.where(too_small, u, lower)
+        upper = np.where(too_small, upper, u)
+    u = (lower + upper) / 2
+    v = 1 - u
+    return v ** 3 * key0[:, 1] + 3 * u * v ** 2 * handle0[:, 1] + 3 * u ** 2 * v * handle1[:, 1] + u ** 3 * key1[:, 1]
+
+
+def evaluate_keyframes(keys, frames, extrapolation="CONSTANT"):
+    """
+    Evaluate F-curve keyframes at arbitrary frames without touching the blender scene.
+    Supported interpolation modes are "CONSTANT", "LINEAR" and "BEZIER". F-curve modifiers are not supported.
+    Args:
+        keys: keyframe dict as returned by keyframes.read_keyframes
+        frames: array of frame numbers
+        extrapolation: "CONSTANT" or "LINEAR" (see FCurve.extrapolation)
+
+    Returns:
+        array of values with the same shape as frames
+    """
+    frames = np.asarray(frames, dtype=float)
+    shape = frames.shape
+    frames = frames.ravel()
+    co = np.asarray(keys["co"], dtype=float)
+    handle_left = np.asarray(keys["handle_left"], dtype=float)
+    handle_right = np.asarray(keys["handle_right"], dtype=float)
+    interpolation = np.asarray(keys["interpolation"])
+    n_keys = len(co)
+    if n_keys == 0:
+        raise ValueError("Can not evaluate an F-curve without keyframes")
+
+    result = np.full(len(frames), co[0, 1])
+    if n_keys > 1:
+        unsupported = set(np.unique(interpolation[:-1]).tolist()) - {0, 1, 2}
+        if unsupported:
+            raise NotImplementedError("Evaluation of interpolation modes "
+                                      f"{[INTERPOLATION_MODE_NAMES[i] for i in unsupported]} is not implemented")
+
+        segment = np.clip(np.searchsorted(co[:, 0], frames, side="right") - 1, 0, n_keys - 2)
+        key0 = co[segment]
+        key1 = co[segment + 1]
+        segment_interpolation = interpolation[segment]
+
+        result = np.where(segment_interpolation == 0, key0[:, 1], result)
+
+        is_linear = segment_interpolation == 1
+        if np.any(is_linear):
+            factor = (frames[is_linear] - key0[is_linear, 0]) / (key1[is_linear, 0] - key0[is_linear, 0])
+            result[is_linear] = key0[is_linear, 1] + factor * (key1[is_linear, 1] - key0[is_linear, 1])
+
+        is_bezier = segment_interpolation == 2
+        if np.any(is_bezier):
+            bezier_segment = segment[is_bezier]
+            result[is_bezier] = _evaluate_bezier(key0[is_bezier], handle_right[bezier_segment],
+                                                 handle_left[bezier_segment + 1], key1[is_bezier], frames[is_bezier])
+
+    for end, neighbour, handle, outside in ((0, 1, handle_left, frames < co[0, 0]),
+                                            (n_keys - 1, n_keys - 2, handle_right, frames >= co[-1, 0])):
+        if not np.any(outside):
+            continue
+        slope = 0
+        if extrapolation == "LINEAR" and interpolation[end] != 0 and n_keys > 1:
+            if interpolation[end] == 2:
+                dx = co[end, 0] - handle[end, 0]
+                slope = (co[end, 1] - handle[end, 1]) / dx if dx != 0 else 0
+            else:
+                slope = (co[neighbour, 1] - co[end, 1]) / (co[neighbour, 0] - co[end, 0])
+        result[outside] = co[end, 1] + slope * (frames[outside] - co[end, 0])
+    return result.reshape(shape)
+
+
+def evaluate_fcurve(fcurve, frames):
+    """
+    Evaluate an F-curve at arbitrary frames by reading its keyframes in bulk (see evaluate_keyframes).
+    """
+    return evaluate_keyframes(keyframes.read_keyframes(fcurve), frames, fcurve.extrapolation)
+
+
+def evaluate_attribute(datablock, data_path, frames):
+    """
+    Evaluate an animated attribute of a datablock e.g. the "location" of an object.
+    Components without F-curve keep their current value.
+
+    Returns:
+        array of shape (n_frames, n_attribute_dimensions)
+    """
+    frames = np.asarray(frames, dtype=float)
+    static_value = np.atleast_1d(np.array(datablock.path_resolve(data_path), dtype=float))
+    result = np.tile(static_value, (len(frames), 1))
+    animation_data = datablock.animation_data
+    if animation_data is not None and animation_data.action is not None:
+        for index in range(len(static_value)):
+            fcurve = find_fcurve(animation_data.action, data_path, index)
+            if fcurve is not None and not fcurve.mute and len(fcurve.keyframe_points):
+                result[:, index] = evaluate_fcurve(fcurve, frames)
+    return result
+
+
+def euler_to_matrices(rotations, order="XYZ"):
+    """
+    Convert euler angles of shape (n, 3) into rotation matrices of shape (n, 3, 3).
+    """
+    rotations = np.asarray(rotations, dtype=float)
+    cos = np.cos(rotations)
+    sin = np.sin(rotations)
+    n = len(rotations)
+    axis_matrices = {}
+    for i, axis in enumerate("XYZ"):
+        matrix = np.zeros((n, 3, 3))
+        a, b = [j for j in range(3) if j != i]
+        matrix[:, i, i] = 1
+        matrix[:, a, a] = cos[:, i]
+        matrix[:, b, b] = cos[:, i]
+        matrix[:, a, b] = -sin[:, i] if i != 1 else sin[:, i]
+        matrix[:, b, a] = sin[:, i] if i != 1 else -sin[:, i]
+        axis_matrices[axis] = matrix
+    return axis_matrices[order[2]] @ axis_matrices[order[1]] @ axis_matrices[order[0]]
+
+
+def quaternions_to_matrices(quaternions):
+    """
+    Convert quaternions (w, x, y, z) of shape (n, 4) into rotation matrices of shape (n, 3, 3).
+    """
+    quaternions = np.asarray(quaternions, dtype=float)
+    quaternions = quaternions / np.linalg.norm(quaternions, axis=1, keepdims=True)
+    w, x, y, z = quaternions.T
+    return np.stack((np.stack((1 - 2 * (y * y + z * z), 2 * (x * y - z * w), 2 * (x * z + y * w)), axis=-1),
+                     np.stack((2 * (x * y + z * w), 1 - 2 * (x * x + z * z), 2 * (y * z - x * w)), axis=-1),
+                     np.stack((2 * (x * z - y * w), 2 * (y * z + x * w), 1 - 2 * (x * x + y * y)), axis=-1)),
+                    axis=1)
+
+
+def compose_matrices(locations, rotation_matrices, scales):
+    """
+    Build 4x4 transformation matrices of shape (n, 4, 4) from locations (n, 3), rotations (n, 3, 3) and scales (n, 3).
+    """
+    matrices = np.zeros((len(locations), 4, 4))
+    matrices[:, :3, :3] = rotation_matrices * np.asarray(scales)[:, np.newaxis, :]
+    matrices[:, :3, 3] = locations
+    matrices[:, 3, 3] = 1
+    return matrices
+
+
+def animated_matrix_basis(bpy_object, frames):
+    """
+    Evaluate location, rotation and scale of an object at the given frames. Constraints and drivers are ignored.
+
+    Returns:
+        array of shape (n_frames, 4, 4)
+    """
+    rotation_mode = bpy_object.rotation_mode
+    if rotation_mode == "QUATERNION":
+        rotations = quaternions_to_matrices(evaluate_attribute(bpy_object, "rotation_quaternion", frames))
+    elif rotation_mode == "AXIS_ANGLE":
+        raise NotImplementedError("Evaluation of the rotation mode AXIS_ANGLE is not implemented")
+    else:
+        rotations = euler_to_matrices(evaluate_attribute(bpy_object, "rotation_euler", frames), rotation_mode)
+    return compose_matrices(evaluate_attribute(bpy_object, "location", frames), rotations,
+                            evaluate_attribute(bpy_object, "scale", frames))
+
+
+def animated_matrix_local(bpy_object, frames):
+    """
+    Evaluate the matrix of an object relative to its parent at the given frames. shape: (n_frames, 4, 4)
+    """
+    return np.array(bpy_object.matrix_parent_inverse) @ animated_matrix_basis(bpy_object, frames)
+
+
+def animated_matrix_world(bpy_object, frames):
+    """
+    Evaluate the world matrix of an object at the given frames, taking the whole parent chain into account.
+    shape: (n_frames, 4, 4)
+    """
+    matrix = animated_matrix_local(bpy_object, frames)
+    if bpy_object.parent is not None:
+        matrix = animated_matrix_world(bpy_object.parent, frames) @ matrix
+    return matrix
+
+
+def transform_points(matrices, points):
+    """
+    Apply 4x4 matrices of shape (..., 4, 4) to points of shape (..., 3).
+    """
+    points = np.asarray(points, dtype=float)
+    return (matrices[..., :3, :3] @ points[..., np.newaxis])[..., 0] + matrices[..., :3, 3]
@@ -0,0 +1,257 @@
+import bpy
+import numpy as np
+from .base_object import HighLevelObject
+from .mesh import mesh_from_arrays, set_vertices
+from . import animation
+from . import keyframes
+
+# The per instance data is stored as vertex positions of the point mesh, one block of n_instances points per entry.
+# Blocks after the first one are removed by the geometry nodes before the instances are created.
+# This way all data lives in the mesh and shape keys can interpolate all of it between cached frames.
+# name: (first block, number of values, default value)
+INSTANCE_ATTRIBUTES = {"locations": (0, 3, 0.0),
+                       "rotations": (1, 3, 0.0),
+                       "scales": (2, 3, 1.0),
+                       "colors": (3, 4, 1.0)}
+# rgb of the colors are stored in block 3, the alpha in the x coordinate of block 4
+N_BLOCKS = 5
+
+
+def _new_group_socket(node_group, name, in_out):
+    if hasattr(node_group, "interface"):
+        # blender 4.0+
+        node_group.interface.new_socket(name=name, in_out=in_out, socket_type="NodeSocketGeometry")
+    elif in_out == "INPUT":
+        node_group.inputs.new("NodeSocketGeometry", name)
+    else:
+        node_group.outputs.new("NodeSocketGeometry", name)
+
+
+def _socket(sockets, name):
+    # some nodes have one socket per data type with the same name, only the one of the chosen type is enabled
+    return next(socket for socket in sockets if socket.name == name and socket.enabled)
+
+
+def instance_on_points_node_group(instance_object, n_instances, name="InstanceOnPoints"):
+    """
+    Geometry nodes group that puts an instance of instance_object on each of the first n_instances points.
+    Rotation (euler angles), scale and color are read from the positions of the following blocks of n_instances points
+    (see INSTANCE_ATTRIBUTES). The color is stored as the point attribute "color", which is passed on to the instances.
+    """
+    node_group = bpy.data.node_groups.new(name, "GeometryNodeTree")
+    _new_group_socket(node_group, "Geometry", "INPUT")
+    _new_group_socket(node_group, "Geometry", "OUTPUT")
+    nodes = node_group.nodes
+    links = node_group.links
+
+    group_input = nodes.new("NodeGroupInput")
+    group_output = nodes.new("NodeGroupOutput")
+    index = nodes.new("GeometryNodeInputIndex")
+    position = nodes.new("GeometryNodeInputPosition")
+
+    def sample_block(block):
+        block_index = nodes.new("ShaderNodeMath")
+        block_index.operation = "ADD"
+        links.new(index.outputs["Index"], block_index.inputs[0])
+        block_index.inputs[1].default_value = block * n_instances
+        sample = nodes.new("GeometryNodeSampleIndex")
+        sample.data_type = "FLOAT_VECTOR"
+        sample.domain = "POINT"
+        links.new(group_input.outputs[0], sample.inputs["Geometry"])
+        links.new(position.outputs["Position"], _socket(sample.inputs, "Value"))
+        links.new(block_index.outputs[0], sample.inputs["Index"])
+        return _socket(sample.outputs, "Value")
+
+    rgb = nodes.new("ShaderNodeSeparateXYZ")
+    links.new(sample_block(3), rgb.inputs["Vector"])
+    alpha = nodes.new("ShaderNodeSeparateXYZ")
+    links.new(sample_block(4), alpha.inputs["Vector"])
+    color = nodes.new("FunctionNodeCombineColor")
+    for channel, (separate, axis) in zip(("Red", "Green", "Blue", "Alpha"),
+                                         ((rgb, "X"), (rgb, "Y"), (rgb, "Z"), (alpha, "X"))):
+        links.new(separate.outputs[axis], color.inputs[channel])
+    store_color = nodes.new("GeometryNodeStoreNamedAttribute")
+    store_color.data_type = "FLOAT_COLOR"
+    store_color.domain = "POINT"
+    store_color.inputs["Name"].default_value = "color"
+    links.new(group_input.outputs[0], store_color.inputs["Geometry"])
+    links.new(color.outputs["Color"], _socket(store_color.inputs, "Value"))
+
+    is_data_point = nodes.new("FunctionNodeCompare")
+    is_data_point.data_type = "FLOAT"
+    is_data_point.operation = "GREATER_EQUAL"
+    links.new(index.outputs["Index"], _socket(is_data_point.inputs, "A"))
+    _socket(is_data_point.inputs, "B").default_value = n_instances
+    delete = nodes.new("GeometryNodeDeleteGeometry")
+    delete.domain = "POINT"
+    links.new(store_color.outputs["Geometry"], delete.inputs["Geometry"])
+    links.new(is_data_point.outputs["Result"], delete.inputs["Selection"])
+
+    instance_on_points = nodes.new("GeometryNodeInstanceOnPoints")
+    object_info = nodes.new("GeometryNodeObjectInfo")
+    object_info.inputs["Object"].default_value = instance_object
+    if "As Instance" in object_info.inputs:
+        object_info.inputs["As Instance"].default_value = True
+    links.new(delete.outputs["Geometry"], instance_on_points.inputs["Points"])
+    links.new(object_info.outputs["Geometry"], instance_on_points.inputs["Instance"])
+    links.new(sample_block(1), instance_on_points.inputs["Rotation"])
+    links.new(sample_block(2), instance_on_points.inputs["Scale"])
+    links.new(instance_on_points.outputs["Instances"], group_output.inputs[0])
+    return node_group
+
+
+class Instancer(HighLevelObject):
+    """
+    Many copies of one object represented by a single blender object: one point per instance and a geometry nodes
+    modifier that instances the object on the points. Blender only has to evaluate one object, no matter how many
+    instances there are.
+    Per instance attributes are numpy arrays. The color is available in materials of the instanced object via an
+    Attribute node of type "Instancer" with the name "color" (see PrincipledBSDF.use_instance_color).
+    All data, including the per-frame caches, is stored in the mesh of the object, so it is saved with the .blend file.
+    """
+
+    def __init__(self, instance_object, locations, rotations=None, scales=None, colors=None, name="Instancer",
+                 lightweight=None):
+        """
+        Args:
+            instance_object: high level object that is instanced e.g. a UVSphere
+            locations: array of shape (n_instances, 3)
+            rotations: euler angles of shape (n_instances, 3) or (3,) for all instances
+            scales: array of shape (n_instances, 3), (3,) or a single number for all instances
+            colors: rgba of shape (n_instances, 4) or (4,) for all instances
+            name:
+            lightweight: see HighLevelObject
+        """
+        locations = np.asarray(locations, dtype=np.float32).reshape(-1, 3)
+        self.instance_object = instance_object
+        self.n_instances = len(locations)
+        blocks = np.zeros((N_BLOCKS * self.n_instances, 3), dtype=np.float32)
+        for attribute, values in (("locations", locations), ("rotations", rotations), ("scales", scales),
+                                  ("colors", colors)):
+            self._write_blocks(blocks, attribute, values)
+        mesh = mesh_from_arrays(name, blocks)
+        bpy_object = bpy.data.objects.new(name, mesh)
+        modifier = bpy_object.modifiers.new("Instancer", "NODES")
+        modifier.node_group = instance_on_points_node_group(instance_object.bpy_object, self.n_instances,
+                                                            name + "Nodes")
+        super().__init__(bpy_object, lightweight=lightweight)
+
+    def _attribute_values(self, attribute, values):
+        _, size, default = INSTANCE_ATTRIBUTES[attribute]
+        if values is None:
+            values = default
+        values = np.asarray(values, dtype=np.float32)
+        if values.ndim == 0:
+            values = np.full(size, values, dtype=np.float32)
+        return np.broadcast_to(values, values.shape[:-2] + (self.n_instances, size))
+
+    def _write_blocks(self, blocks, attribute, values):
+        """
+        Write values of shape (..., n_instances, size) into blocks of shape (..., N_BLOCKS * n_instances, 3).
+        """
+        first_block, _, _ = INSTANCE_ATTRIBUTES[attribute]
+        values = self._attribute_values(attribute, values)
+        n = self.n_instances
+        blocks[..., first_block * n:(first_block + 1) * n, :] = values[..., :3]
+        if values.shape[-1] == 4:
+            blocks[..., (first_block + 1) * n:(first_block + 2) * n, 0] = values[..., 3]
+
+    def _get_attribute(self, attribute):
+        first_block, size, _ = INSTANCE_ATTRIBUTES[attribute]
+        blocks = np.empty(len(self.bpy_object.data.vertices) * 3, dtype=np.float32)
+        self.bpy_object.data.vertices.foreach_get("co", blocks)
+        blocks = blocks.reshape(N_BLOCKS, self.n_instances, 3)
+        if size == 4:
+            return np.concatenate((blocks[first_block], blocks[first_block + 1, :, :1]), axis=1)
+        return blocks[first_block]
+
+    def _set_attribute(self, attribute, values):
+        mesh = self.bpy_object.data
+        blocks = np.empty((len(mesh.vertices), 3), dtype=np.float32)
+        mesh.vertices.foreach_get("co", blocks.ravel())
+        self._write_blocks(blocks, attribute, values)
+        set_vertices(mesh, blocks)
+        self.mark_dirty()
+
+    @property
+    def locations(self):
+        return self._get_attribute("locations")
+
+    @locations.setter
+    def locations(self, value):
+        self._set_attribute("locations", value)
+
+    @property
+    def rotations(self):
+        return self._get_attribute("rotations")
+
+    @rotations.setter
+    def rotations(self, value):
+        self._set_attribute("rotations", value)
+
+    @property
+    def scales(self):
+        return self._get_attribute("scales")
+
+    @scales.setter
+    def scales(self, value):
+        self._set_attribute("scales", value)
+
+    @property
+    def colors(self):
+        return self._get_attribute("colors")
+
+    @colors.setter
+    def colors(self, value):
+        self._set_attribute("colors", value)
+
+    def cache_frames(self, frame_numbers, locations=None, rotations=None, scales=None, colors=None):
+        """
+        Animate the instances with per-frame caches. Every cached frame is stored as a shape key of the point mesh.
+        The shape key values are keyframed such that blender interpolates linearly between neighbouring cached frames.
+        Before the first and after the last cached frame the first respectively last values are used.
+        Attributes that are not given keep their current values. A previous cache is replaced and values set
+        afterwards via the properties are hidden by the cache.
+        Args:
+            frame_numbers: increasing frame numbers of shape (n_frames,)
+            locations: array of shape (n_frames, n_instances, 3)
+            rotations: array of shape (n_frames, n_instances, 3)
+            scales: array of shape (n_frames, n_instances, 3)
+            colors: array of shape (n_frames, n_instances, 4)
+        """
+        frame_numbers = np.asarray(frame_numbers, dtype=float)
+        mesh = self.bpy_object.data
+        blocks = np.empty((len(mesh.vertices), 3), dtype=np.float32)
+        mesh.vertices.foreach_get("co", blocks.ravel())
+        blocks = np.repeat(blocks[np.newaxis], len(frame_numbers), axis=0)
+        for attribute, values in (("locations", locations), ("rotations", rotations), ("scales", scales),
+                                  ("colors", colors)):
+            if values is None:
+                continue
+            values = np.asarray(values, dtype=np.float32)
+            if values.shape[:2] != (len(frame_numbers), self.n_instances):
+                raise ValueError(f"{attribute} must have the shape (n_frames, n_instances, ...) = "
+                                 f"({len(frame_numbers)}, {self.n_instances}, ...) but has the shape {values.shape}")
+            self._write_blocks(blocks, attribute, values)
+
+        if mesh.shape_keys is not None:
+            animation_data = mesh.shape_keys.animation_data
+            old_action = None if animation_data is None else animation_data.action
+            self.bpy_object.shape_key_clear()
+            if old_action is not None and old_action.users == 0:
+                animation.invalidate_fcurve_index(old_action)
+                bpy.data.actions.remove(old_action)
+        # the basis is the first cached frame, every other frame gets a shape key relative to it
+        basis = self.bpy_object.shape_key_add(name="Basis", from_mix=False)
+        basis.data.foreach_set("co", blocks[0].ravel())
+        with animation.animation_batch():
+            for i in range(1, len(frame_numbers)):
+                key_block = self.bpy_object.shape_key_add(name=f"frame_{i}", from_mix=False)
+                key_block.data.foreach_set("co", blocks[i].ravel())
+                # 1 on its own frame, falling linearly to 0 at the neighbouring cached frames
+                neighbours = frame_numbers[max(i - 1, 0):i + 2]
+                values = (neighbours == frame_numbers[i]).astype(float)
+                animation.insert_keyframes(mesh.shape_keys, f'key_blocks["{key_block.name}"].value', 0,
+                                           keyframes.build_keyframes(neighbours, values, "LINEAR"))
+        mesh.update()
+        self.mark_dirty()
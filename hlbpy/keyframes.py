@@ -0,0 +1,278 @@
+import os
+import numpy as np
+
+INTERPOLATION_MODES = {"CONSTANT": 0, "LINEAR": 1, "BEZIER": 2, "BACK": 3, "BOUNCE": 4, "CIRC": 5, "CUBIC": 6,
+                       "ELASTIC": 7, "EXPO": 8, "QUAD": 9, "QUART": 10, "QUINT": 11, "SINE": 12}
+EASING_TYPES = {"AUTO": 0, "EASE_IN": 1, "EASE_OUT": 2, "EASE_IN_OUT": 3}
+HANDLE_TYPES = {"FREE": 0, "AUTO": 1, "VECTOR": 2, "ALIGNED": 3, "AUTO_CLAMPED": 4}
+KEYFRAME_TYPES = {"KEYFRAME": 0, "EXTREME": 1, "BREAKDOWN": 2, "JITTER": 3, "MOVING_HOLD": 4}
+
+# name: (values per keyframe, dtype, default value)
+KEYFRAME_PROPERTIES = {"co": (2, np.float32, 0),
+                       "handle_left": (2, np.float32, 0),
+                       "handle_right": (2, np.float32, 0),
+                       "handle_left_type": (1, np.int32, HANDLE_TYPES["AUTO_CLAMPED"]),
+                       "handle_right_type": (1, np.int32, HANDLE_TYPES["AUTO_CLAMPED"]),
+                       "interpolation": (1, np.int32, INTERPOLATION_MODES["BEZIER"]),
+                       "easing": (1, np.int32, EASING_TYPES["AUTO"]),
+                       "amplitude": (1, np.float32, 0.8),
+                       "period": (1, np.float32, 4.1),
+                       "back": (1, np.float32, 1.70158),
+                       "type": (1, np.int32, KEYFRAME_TYPES["KEYFRAME"])}
+
+ENUM_PROPERTIES = {"handle_left_type": HANDLE_TYPES, "handle_right_type": HANDLE_TYPES,
+                   "interpolation": INTERPOLATION_MODES, "easing": EASING_TYPES, "type": KEYFRAME_TYPES}
+
+COLLISION_POLICIES = ("replace", "keep", "error")
+
+CHUNK_SIZE = 65536
+
+
+def as_enum_array(value, enum_items, n):
+    """
+    Convert an enum given as string, number or per keyframe sequence of those into an int array of length n.
+    """
+    if isinstance(value, str):
+        return np.full(n, enum_items[value], dtype=np.int32)
+    if isinstance(value, np.ndarray) and value.dtype.kind in "US":
+        value = value.tolist()
+    if not isinstance(value, np.ndarray):
+        try:
+            value = [enum_items[v] if isinstance(v, str) else v for v in value]
+        except TypeError:
+            pass
+    return np.broadcast_to(np.asarray(value, dtype=np.int32), (n,))
+
+
+def select_channel(value, channel):
+    """
+    Per keyframe properties can be given for all attribute dimensions at once with shape (n_keyframes, n_dimensions).
+    Returns the values for one dimension or value unchanged if it is the same for all dimensions.
+    """
+    if value is None or isinstance(value, str):
+        return value
+    array = np.asarray(value)
+    if array.ndim == 2:
+        return array[:, channel]
+    return value
+
+
+def empty_keyframes(n=0):
+    """
+    Returns a keyframe dict with n keyframes where every property is set to its default value.
+    """
+    keys = {}
+    for name, (size, dtype, default) in KEYFRAME_PROPERTIES.items():
+        shape = (n, size) if size > 1 else (n,)
+        keys[name] = np.full(shape, default, dtype=dtype)
+    return keys
+
+
+def build_keyframes(frame_numbers, values, interpolation="LINEAR", handles_left=None, handles_right=None,
+                    **properties):
+    """
+    Build a keyframe dict for one F-curve.
+    Args:
+        frame_numbers: shape (n_keyframes,)
+        values: shape (n_keyframes,)
+        interpolation: interpolation mode name or one mode (name or number) per keyframe
+        handles_left: handle coordinates relative to the keyframe coordinate. shape (n_keyframes, 2)
+                      If None, the handles are calculated automatically by blender.
+        handles_right: equivalent to handles_left
+        **properties: further keyframe properties e.g. amplitude=0.5 or easing=["EASE_IN", "EASE_OUT"].
+                      A single value is used for all keyframes. None values are ignored.
+
+    Returns:
+        dict mapping keyframe property names to arrays
+    """
+    n = len(values)
+    keys = empty_keyframes(n)
+    keys["co"][:, 0] = frame_numbers
+    keys["co"][:, 1] = values
+    for side, handles in (("left", handles_left), ("right", handles_right)):
+        keys["handle_" + side][:] = keys["co"]
+        if handles is not None:
+            keys["handle_" + side] += handles
+            keys[f"handle_{side}_type"][:] = HANDLE_TYPES["FREE"]
+    keys["interpolation"][:] = as_enum_array(interpolation, INTERPOLATION_MODES, n)
+    for name, value in properties.items():
+        if name not in KEYFRAME_PROPERTIES:
+            raise ValueError(f"'{name}' is not a keyframe property")
+        if value is None:
+            continue
+        if name in ENUM_PROPERTIES:
+            value = as_enum_array(value, ENUM_PROPERTIES[name], n)
+        keys[name][:] = value
+    return keys
+
+
+def read_keyframes(fcurve):
+    """
+    Read all keyframes of an F-curve with one foreach_get per property.
+    """
+    keyframe_points = fcurve.keyframe_points
+    n = len(keyframe_points)
+    keys = {}
+    for name, (size, dtype, _) in KEYFRAME_PROPERTIES.items():
+        buffer = np.empty(n * size, dtype=dtype)
+        keyframe_points.foreach_get(name, buffer)
+        keys[name] = buffer.reshape(n, size) if size > 1 else buffer
+    return keys
+
+
+def write_keyframes(fcurve, keys):
+    """
+    Replace all keyframes of an F-curve with one foreach_set per property.
+    Keyframe points are added or removed so that the F-curve ends up with exactly as many keyframes as given.
+    """
+    keyframe_points = fcurve.keyframe_points
+    n = len(keys["co"])
+    n_present = len(keyframe_points)
+    if n > n_present:
+        keyframe_points.add(n - n_present)
+    else:
+        for _ in range(n_present - n):
+            keyframe_points.remove(keyframe_points[-1], fast=True)
+
+    for name, (_, dtype, _) in KEYFRAME_PROPERTIES.items():
+        keyframe_points.foreach_set(name, np.ascontiguousarray(keys[name], dtype=dtype).ravel())
+    fcurve.update()
+
+
+def write_new_keyframes(fcurve, co, interpolation):
+    """
+    Fast path for F-curves without keyframes: only the coordinates and the interpolation are written
+    (and the easing parameters if easing interpolation modes are used).
+    Args:
+        fcurve: F-curve without keyframes
+        co: contiguous float32 array of shape (n_keyframes, 2) with (frame, value) pairs
+        interpolation: int32 array of shape (n_keyframes,)
+    """
+    keyframe_points = fcurve.keyframe_points
+    keyframe_points.add(len(co))
+    keyframe_points.foreach_set("co", np.ascontiguousarray(co, dtype=np.float32).ravel())
+    interpolation = np.ascontiguousarray(interpolation, dtype=np.int32)
+    keyframe_points.foreach_set("interpolation", interpolation)
+    if np.any(interpolation > INTERPOLATION_MODES["BEZIER"]):
+        for name in ("amplitude", "period", "back"):
+            _, dtype, default = KEYFRAME_PROPERTIES[name]
+            keyframe_points.foreach_set(name, np.full(len(co), default, dtype=dtype))
+    fcurve.update()
+
+
+def iter_channels(values, frame_numbers=None, chunk_size=CHUNK_SIZE):
+    """
+    Interleave frame numbers and values of every attribute dimension into (frame, value) pairs.
+    Args:
+        values: array of shape (n_keyframes,) or (n_keyframes, n_attribute_dimensions). It can also be a np.memmap,
+                the path of a .npy file (which is memory mapped), or an iterator over chunks of such arrays.
+        frame_numbers: List of frame numbers. If None frame numbers 0,1,2,3.. will be used.
+        chunk_size: number of keyframes that are read from values at once
+
+    Yields:
+        (dimension, n_attribute_dimensions, co) where co is a float32 array of shape (n_keyframes, 2).
+        Arrays are copied chunk by chunk into one interleave buffer that is reused for every dimension,
+        so co is only valid until the next dimension is requested.
+        The chunks of an iterator are first collected into one float32 array of all values since the number of
+        keyframes is only known at the end (see _iter_channels_from_chunks).
+    """
+    if isinstance(values, (str, os.PathLike)):
+        values = np.load(values, mmap_mode="r")
+    elif iter(values) is values:
+        yield from _iter_channels_from_chunks(values, frame_numbers, chunk_size)
+        return
+    elif not isinstance(values, np.ndarray):
+        values = np.asarray(values)
+
+    n = len(values)
+    n_dimensions = 1 if values.ndim == 1 else values.shape[1]
+    frame_numbers = np.arange(n) if frame_numbers is None else np.asarray(frame_numbers)
+    co = np.empty((n, 2), dtype=np.float32)
+    for dimension in range(n_dimensions):
+        for start in range(0, n, chunk_size):
+            stop = start + chunk_size
+            co[start:stop, 0] = frame_numbers[start:stop]
+            co[start:stop, 1] = values[start:stop] if values.ndim == 1 else values[start:stop, dimension]
+        yield dimension, n_dimensions, co
+
+
+def _iter_channels_from_chunks(chunks, frame_numbers, chunk_size):
+    """
+    Collect the chunks into one float32 array of shape (n_keyframes, n_attribute_dimensions) and interleave it like
+    an array. If frame_numbers is given, the array is allocated once with its length. Otherwise the chunks are kept
+    as float32 copies until the iterator is exhausted and moved into the array one by one.
+    """
+    if frame_numbers is not None:
+        values = None
+        n = 0
+        for chunk in chunks:
+            chunk = np.asarray(chunk, dtype=np.float32)
+            if values is None:
+                values = np.empty((len(frame_numbers),) + chunk.shape[1:], dtype=np.float32)
+            if n + len(chunk) > len(values):
+                raise ValueError(f"Got more values than the {len(frame_numbers)} frame numbers")
+            values[n:n + len(chunk)] = chunk
+            n += len(chunk)
+        if values is None:
+            return
+        if n != len(values):
+            raise ValueError(f"Got {n} values for {len(frame_numbers)} frame numbers")
+    else:
+        collected = [np.asarray(chunk, dtype=np.float32) for chunk in chunks]
+        if not collected:
+            return
+        values = np.empty((sum(len(chunk) for chunk in collected),) + collected[0].shape[1:], dtype=np.float32)
+        n = 0
+        collected.reverse()
+        while collected:
+            # release every chunk as soon as it is copied
+            chunk = collected.pop()
+            values[n:n + len(chunk)] = chunk
+            n += len(chunk)
+    yield from iter_channels(values, frame_numbers, chunk_size)
+
+
+def merge_keyframes(existing, new, on_collision="replace"):
+    """
+    Merge two keyframe dicts and sort the result by frame.
+    Args:
+        existing: keyframe dict e.g. from read_keyframes
+        new: keyframe dict e.g. from build_keyframes
+        on_collision: what to do if both contain a keyframe on the same frame:
+                      "replace": the new keyframe is used
+                      "keep": the existing keyframe is kept
+                      "error": a ValueError is raised
+
+    Returns:
+        merged keyframe dict
+    """
+    return combine_keyframes([existing, new], on_collision)
+
+
+def combine_keyframes(keyframe_dicts, on_collision="replace"):
+    """
+    Concatenate any number of keyframe dicts and sort the result by frame.
+    Keyframes on the same frame are resolved according to on_collision (see merge_keyframes),
+    where later dicts count as newer than earlier ones.
+    """
+    if on_collision not in COLLISION_POLICIES:
+        raise ValueError(f"on_collision must be one of {COLLISION_POLICIES} but is '{on_collision}'")
+
+    combined = {name: np.concatenate([np.asarray(keys[name], dtype=dtype) for keys in keyframe_dicts])
+                for name, (_, dtype, _) in KEYFRAME_PROPERTIES.items()}
+    frames = combined["co"][:, 0]
+    if len(frames) == 0:
+        return combined
+
+    order = np.argsort(frames, kind="stable")
+    sorted_frames = frames[order]
+    is_new_frame = sorted_frames[1:] != sorted_frames[:-1]
+    if on_collision == "replace":
+        use = np.append(is_new_frame, True)
+    else:
+        use = np.insert(is_new_frame, 0, True)
+        if on_collision == "error" and not np.all(use):
+            colliding = np.unique(sorted_frames[~use])
+            raise ValueError(f"Keyframes already exist on frames {colliding.tolist()}")
+    order = order[use]
+    return {name: array[order] for name, array in combined.items()}
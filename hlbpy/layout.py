@@ -0,0 +1,200 @@
+import numpy as np
+from .base import deferred_updates
+from .base_object import HighLevelObject, bound_point
+from .directions import CENTER, RIGHT, DOWN
+
+
+class Layout:
+    """
+    Collects placement constraints for many objects and solves them at once.
+    The boxes of all objects are read once (see HighLevelObject.get_box), every constraint moves the boxes in numpy
+    and the resulting translations are applied in one pass when apply is called.
+    Constraints are solved in the order they were added, so later constraints see the result of earlier ones.
+    All constraints work in global space. An object should not be moved together with one of its ancestors.
+
+    Example:
+        layout = Layout()
+        layout.arrange(spheres, RIGHT, buff=0.5)
+        layout.next_to(labels, spheres, UP, buff=0.1)
+        layout.apply()
+    """
+
+    def __init__(self):
+        self.objects = []
+        self._indices = {}
+        self.constraints = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        if exc_type is None:
+            self.apply()
+
+    def _index(self, objects):
+        indices = []
+        for obj in objects:
+            if obj not in self._indices:
+                self._indices[obj] = len(self.objects)
+                self.objects.append(obj)
+            indices.append(self._indices[obj])
+        return np.array(indices, dtype=int)
+
+    @staticmethod
+    def _as_list(objects):
+        if isinstance(objects, HighLevelObject):
+            return [objects]
+        # e.g. a Collection
+        return list(getattr(objects, "objects", objects))
+
+    def next_to(self, objects, references, direction=RIGHT, buff=0.25, aligned_edge=CENTER):
+        """
+        Place objects next to references.
+        Args:
+            objects: an object or a list of objects
+            references: one reference for all objects or one reference per object
+            direction: side of the reference the objects are placed on e.g. UP
+            buff: distance between the object and the reference
+            aligned_edge: edge of object and reference that are aligned e.g. LEFT to left align a label above an object
+        """
+        objects = self._as_list(objects)
+        references = self._as_list(references)
+        if len(references) == 1:
+            references = references * len(objects)
+        if len(references) != len(objects):
+            raise ValueError(f"Got {len(references)} references for {len(objects)} objects")
+        self.constraints.append(("next_to", self._index(objects), self._index(references),
+                                 np.asarray(direction, dtype=float), buff, np.asarray(aligned_edge, dtype=float)))
+        return self
+
+    def align(self, objects, reference, direction):
+        """
+        Move objects so their bound in direction matches the bound of the reference.
+        Only the axes in which direction is non-zero are changed e.g. align(labels, title, LEFT) only changes x.
+        reference can also be a point.
+        """
+        objects = self._as_list(objects)
+        if isinstance(reference, HighLevelObject):
+            reference = self._index([reference])[0]
+        else:
+            reference = np.asarray(reference, dtype=float)
+        self.constraints.append(("align", self._index(objects), reference, np.asarray(direction, dtype=float)))
+        return self
+
+    def arrange(self, objects, direction=RIGHT, buff=0.25, aligned_edge=CENTER, center=None):
+        """
+        Put objects in a row or column, each next to the one before.
+        Args:
+            objects: list of objects
+            direction: direction of the row e.g. RIGHT or DOWN for a column
+            buff: distance between neighbouring objects
+            aligned_edge: see next_to
+            center: center of the arranged objects. If None, the center of the box around the objects is kept.
+        """
+        self.constraints.append(("arrange", self._index(self._as_list(objects)), np.asarray(direction, dtype=float),
+                                 buff, np.asarray(aligned_edge, dtype=float), center))
+        return self
+
+    def grid(self, objects, n_columns, buff=0.25, column_direction=RIGHT, row_direction=DOWN, center=None):
+        """
+        Put objects row by row into a grid. Every object is centered in its cell, every column is as wide as its
+        widest object and every row as high as its highest object.
+        Args:
+            objects: list of objects
+            n_columns: number of columns
+            buff: distance between cells. A single value or (column buff, row buff)
+            column_direction: direction in which the columns follow each other
+            row_direction: direction in which the rows follow each other
+            center: center of the grid. If None, the center of the box around the objects is kept.
+        """
+        self.constraints.append(("grid", self._index(self._as_list(objects)), n_columns, np.broadcast_to(buff, (2,)),
+                                 np.asarray(column_direction, dtype=float), np.asarray(row_direction, dtype=float),
+                                 center))
+        return self
+
+    def solve(self):
+        """
+        Solve all constraints.
+        Returns:
+            translations in global space of shape (n_objects, 3) in the order of layout.objects
+        """
+        boxes = np.array([obj.get_box(in_global_space=True) for obj in self.objects]).reshape(-1, 2, 3)
+        min_points = boxes[:, 0].copy()
+        max_points = boxes[:, 1].copy()
+        for kind, indices, *args in self.constraints:
+            if len(indices) == 0:
+                continue
+            translation = getattr(self, "_solve_" + kind)(min_points, max_points, indices, *args)
+            min_points[indices] += translation
+            max_points[indices] += translation
+        return min_points - boxes[:, 0]
+
+    @staticmethod
+    def _solve_next_to(min_points, max_points, indices, reference_indices, direction, buff, aligned_edge):
+        target = bound_point(min_points[reference_indices], max_points[reference_indices], aligned_edge + direction)
+        anchor = bound_point(min_points[indices], max_points[indices], aligned_edge - direction)
+        return target + buff * direction - anchor
+
+    @staticmethod
+    def _solve_align(min_points, max_points, indices, reference, direction):
+        if np.ndim(reference) == 0:
+            reference = bound_point(min_points[reference], max_points[reference], direction)
+        translation = reference - bound_point(min_points[indices], max_points[indices], direction)
+        return np.where(direction != 0, translation, 0)
+
+    @staticmethod
+    def _solve_arrange(min_points, max_points, indices, direction, buff, aligned_edge, center):
+        back = bound_point(min_points[indices], max_points[indices], aligned_edge - direction)
+        front = bound_point(min_points[indices], max_points[indices], aligned_edge + direction)
+        steps = front - back + buff * direction
+        targets = back[0] + np.concatenate((np.zeros((1, 3)), np.cumsum(steps[:-1], axis=0)))
+        translation = targets - back
+        return translation + _recentering(min_points[indices], max_points[indices], translation, center)
+
+    @staticmethod
+    def _solve_grid(min_points, max_points, indices, n_columns, buff, column_direction, row_direction, center):
+        n = len(indices)
+        column = np.arange(n) % n_columns
+        row = np.arange(n) // n_columns
+        sizes = max_points[indices] - min_points[indices]
+        centers = (min_points[indices] + max_points[indices]) / 2
+
+        targets = centers.copy()
+        for cell_index, n_cells, cell_direction, cell_buff in ((column, n_columns, column_direction, buff[0]),
+                                                               (row, row[-1] + 1, row_direction, buff[1])):
+            axis = np.argmax(np.abs(cell_direction))
+            cell_sizes = np.zeros(n_cells)
+            np.maximum.at(cell_sizes, cell_index, sizes[:, axis])
+            starts = np.concatenate(([0], np.cumsum(cell_sizes + cell_buff)[:-1]))
+            targets[:, axis] = np.sign(cell_direction[axis]) * (starts + cell_sizes / 2)[cell_index]
+        translation = targets - centers
+        return translation + _recentering(min_points[indices], max_points[indices], translation, center)
+
+    def apply(self):
+        """
+        Solve all constraints and move the objects. Every object is moved by changing its location once.
+        """
+        if not self.objects:
+            return self
+        translations = self.solve()
+        # location changes move an object in global space by parent world matrix @ matrix_parent_inverse
+        location_to_world = np.array([obj.get_matrix(in_global_space=True) @
+                                      np.linalg.inv(np.array(obj.bpy_object.matrix_basis))
+                                      for obj in self.objects])[:, :3, :3]
+        location_changes = np.linalg.solve(location_to_world, translations[..., np.newaxis])[..., 0]
+        with deferred_updates():
+            for obj, change in zip(self.objects, location_changes):
+                if np.any(change):
+                    obj.location = np.array(obj.location) + change
+        return self
+
+
+def _recentering(min_points, max_points, translation, center):
+    """
+    Additional translation that moves the center of the box around the translated boxes to center or,
+    if center is None, back to the center of the box around the boxes before the translation.
+    """
+    if center is None:
+        center = (min_points.min(axis=0) + max_points.max(axis=0)) / 2
+    moved_center = ((min_points + translation).min(axis=0) + (max_points + translation).max(axis=0)) / 2
+    return np.asarray(center, dtype=float) - moved_center
@@ -42,4 +42,13 @@ class PrincipledBSDF(HighLevelBase):
     def roughness(self, value):
         self.principled_BSDF_node.inputs["Roughness"].default_value = value
 
-
+    def use_instance_color(self, attribute="color"):
+        """
+        Take the base color from an attribute of the instancer e.g. the colors of an Instancer.
+        """
+        attribute_node = self.bpy_object.node_tree.nodes.new("ShaderNodeAttribute")
+        attribute_node.attribute_type = "INSTANCER"
+        attribute_node.attribute_name = attribute
+        self.bpy_object.node_tree.links.new(attribute_node.outputs["Color"],
+                                            self.principled_BSDF_node.inputs["Base Color"])
+        return self
@@ -1,52 +1,301 @@
 import bpy
 import bmesh
+import numpy as np
 from .base_object import HighLevelObject
+from .evaluation import transform_points
+from . import detail
+
+# (primitive type, parameters...) -> mesh datablock shared by all primitives with these parameters
+_primitive_meshes = {}
+
+
+def primitive_mesh(key, build):
+    """
+    Returns the cached mesh of a primitive or builds it once with build(name).
+    Cached meshes get a fake user, so they survive when all their objects are deleted and are never changed in place:
+    objects that change their geometry get their own copy first (see HighLevelObject.ensure_own_data).
+    Args:
+        key: tuple like ("UV_SPHERE", u_segments, v_segments, radius)
+        build: function that creates the mesh given a name
+    """
+    mesh = _primitive_meshes.get(key)
+    if mesh is not None:
+        try:
+            mesh.name
+        except ReferenceError:
+            # removed outside of hlbpy
+            mesh = None
+    if mesh is None:
+        mesh = build("_".join(str(part) for part in key))
+        mesh.use_fake_user = True
+        _primitive_meshes[key] = mesh
+    return mesh
+
+
+def clear_primitive_cache():
+    """
+    Forget all cached primitive meshes and remove the ones that are not used by any object.
+    """
+    meshes = []
+    for mesh in _primitive_meshes.values():
+        try:
+            mesh.use_fake_user = False
+        except ReferenceError:
+            continue
+        meshes.append(mesh)
+    _primitive_meshes.clear()
+    bpy.data.batch_remove([mesh for mesh in meshes if mesh.users == 0])
+
+
+def _foreach_get(bpy_collection, attribute, size, dtype):
+    buffer = np.empty(len(bpy_collection) * size, dtype=dtype)
+    bpy_collection.foreach_get(attribute, buffer)
+    return buffer.reshape(-1, size) if size > 1 else buffer
+
+
+def set_vertices(mesh, vertices):
+    """
+    Overwrite the vertex coordinates of a mesh with an array of shape (n_vertices, 3).
+    """
+    vertices = np.ascontiguousarray(vertices, dtype=np.float32)
+    if vertices.shape != (len(mesh.vertices), 3):
+        raise ValueError(f"The mesh has {len(mesh.vertices)} vertices but vertices has the shape {vertices.shape}")
+    mesh.vertices.foreach_set("co", vertices.ravel())
+    mesh.update()
+
+
+def mesh_from_arrays(name, vertices, faces=(), edges=()):
+    """
+    Build a mesh with foreach_set instead of from_pydata.
+    Args:
+        name:
+        vertices: array of shape (n_vertices, 3)
+        faces: array of shape (n_faces, n_corners) or a list of vertex index sequences of different lengths
+        edges: array of shape (n_edges, 2). Edges of faces are added automatically.
+
+    Returns:
+        the mesh
+    """
+    vertices = np.ascontiguousarray(vertices, dtype=np.float32).reshape(-1, 3)
+    edges = np.ascontiguousarray(edges, dtype=np.int32).reshape(-1, 2)
+    if isinstance(faces, np.ndarray) or len({len(face) for face in faces}) <= 1:
+        faces = np.asarray(faces, dtype=np.int32)
+        loop_totals = np.full(len(faces), faces.shape[1] if faces.ndim == 2 else 0, dtype=np.int32)
+        loops = faces.ravel()
+    else:
+        loop_totals = np.array([len(face) for face in faces], dtype=np.int32)
+        loops = np.concatenate([np.asarray(face, dtype=np.int32) for face in faces])
+    loop_starts = (np.cumsum(loop_totals) - loop_totals).astype(np.int32)
+
+    mesh = bpy.data.meshes.new(name)
+    mesh.vertices.add(len(vertices))
+    mesh.vertices.foreach_set("co", vertices.ravel())
+    mesh.edges.add(len(edges))
+    mesh.edges.foreach_set("vertices", edges.ravel())
+    mesh.loops.add(len(loops))
+    mesh.loops.foreach_set("vertex_index", loops)
+    mesh.polygons.add(len(loop_totals))
+    mesh.polygons.foreach_set("loop_start", loop_starts)
+    try:
+        mesh.polygons.foreach_set("loop_total", loop_totals)
+    except (AttributeError, TypeError):
+        # read-only since blender 4.0, derived from loop_start
+        pass
+    mesh.update(calc_edges=True)
+    mesh.validate()
+    return mesh
 
 
 class MeshObject(HighLevelObject):
-    def shade_smooth(self):
+    """
+    Mesh object with numpy access to its geometry. Arrays are read and written with foreach_get / foreach_set.
+    Setting geometry copies shared mesh data first (see HighLevelObject.ensure_own_data).
+    """
+    __slots__ = ()
+
+    @classmethod
+    def from_arrays(cls, vertices, faces=(), edges=(), name="mesh"):
+        """
+        Create a mesh object from numpy arrays (see mesh_from_arrays).
+        """
+        mesh = mesh_from_arrays(name, vertices, faces, edges)
+        return cls(bpy.data.objects.new(name, mesh))
+
+    @property
+    def vertices(self):
+        """
+        Vertex coordinates in object space. shape: (n_vertices, 3)
+        """
+        return _foreach_get(self.bpy_object.data.vertices, "co", 3, np.float32)
+
+    @vertices.setter
+    def vertices(self, value):
+        set_vertices(self.ensure_own_data(), value)
+        self.mark_dirty()
+
+    @property
+    def edges(self):
+        """
+        Vertex indices of the edges. shape: (n_edges, 2)
+        """
+        return _foreach_get(self.bpy_object.data.edges, "vertices", 2, np.int32)
+
+    @property
+    def faces(self):
+        """
+        Vertex indices of the faces as array of shape (n_faces, n_corners) if all faces have the same number of
+        corners, otherwise as list of arrays.
+        """
         mesh = self.bpy_object.data
-        mesh.polygons.foreach_set("use_smooth", [True] * len(mesh.polygons))
+        loop_starts = _foreach_get(mesh.polygons, "loop_start", 1, np.int32)
+        loop_totals = _foreach_get(mesh.polygons, "loop_total", 1, np.int32)
+        loops = _foreach_get(mesh.loops, "vertex_index", 1, np.int32)
+        if len(loop_totals) and np.all(loop_totals == loop_totals[0]):
+            return loops[loop_starts[:, np.newaxis] + np.arange(loop_totals[0])]
+        return [loops[start:start + total] for start, total in zip(loop_starts, loop_totals)]
+
+    @property
+    def normals(self):
+        """
+        Vertex normals. shape: (n_vertices, 3)
+        """
+        return _foreach_get(self.bpy_object.data.vertices, "normal", 3, np.float32)
+
+    @property
+    def face_normals(self):
+        """
+        Face normals. shape: (n_faces, 3)
+        """
+        return _foreach_get(self.bpy_object.data.polygons, "normal", 3, np.float32)
+
+    @property
+    def uvs(self):
+        """
+        UV coordinates of the active uv map per face corner (loop). shape: (n_loops, 2) or None without uv map
+        """
+        uv_layer = self.bpy_object.data.uv_layers.active
+        return None if uv_layer is None else _foreach_get(uv_layer.data, "uv", 2, np.float32)
+
+    @uvs.setter
+    def uvs(self, value):
+        mesh = self.ensure_own_data()
+        uv_layer = mesh.uv_layers.active or mesh.uv_layers.new()
+        uv_layer.data.foreach_set("uv", np.ascontiguousarray(value, dtype=np.float32).ravel())
+
+    def transform_vertices(self, matrix):
+        """
+        Apply a 4x4 (or 3x3) matrix to all vertices at once, e.g. to scale or shift the geometry.
+        """
+        matrix = np.asarray(matrix, dtype=float)
+        if matrix.shape == (3, 3):
+            matrix = np.block([[matrix, np.zeros((3, 1))], [np.zeros((1, 3)), np.ones((1, 1))]])
+        self.vertices = transform_points(matrix, self.vertices)
+        return self
+
+    def shade_smooth(self):
+        self._set_smooth(True)
 
     def shade_flat(self):
-        mesh = self.bpy_object.data
-        mesh.polygons.foreach_set("use_smooth", [False] * len(mesh.polygons))
+        self._set_smooth(False)
 
+    def _set_smooth(self, value):
+        polygons = self.bpy_object.data.polygons
+        if np.all(_foreach_get(polygons, "use_smooth", 1, bool) == value):
+            # nothing to change, so shared data does not have to be copied
+            return
+        polygons = self.ensure_own_data().polygons
+        polygons.foreach_set("use_smooth", np.full(len(polygons), value, dtype=bool))
 
-class Cuboid(MeshObject):
-    def __init__(self, shape=(1, 1, 1), limits=None, name="cuboid"):
+
+def _build_cuboid(shape, corner_origin):
+    def build(name):
         mesh = bpy.data.meshes.new(name)
-        bpy_object = bpy.data.objects.new(name, mesh)
         bm = bmesh.new()
         bmesh.ops.create_cube(bm, size=1.0)
         bm.to_mesh(mesh)
         bm.free()
+        vertices = _foreach_get(mesh.vertices, "co", 3, np.float32) * shape
+        if corner_origin:
+            # shift origin to corner
+            vertices += np.array(shape) * 0.5
+        set_vertices(mesh, vertices)
+        return mesh
+    return build
+
+
+class Cuboid(MeshObject):
+    __slots__ = ()
+
+    def __init__(self, shape=(1, 1, 1), limits=None, name="cuboid", cached=True, lightweight=None):
+        """
+        Args:
+            shape: edge lengths in x, y and z
+            limits: ((x_min, x_max), (y_min, y_max), (z_min, z_max)). If given, shape is ignored and the origin is
+                    put to the (x_min, y_min, z_min) corner.
+            name:
+            cached: share the mesh with all cuboids of the same shape (see primitive_mesh)
+            lightweight: see HighLevelObject
+        """
         if limits is not None:
             shape = tuple(lim[1] - lim[0] for lim in limits)
-        for vertex in bpy_object.data.vertices:
-            for i in range(3):
-                vertex.co[i] *= shape[i]
+        shape = tuple(float(length) for length in shape)
+        build = _build_cuboid(shape, limits is not None)
+        if cached:
+            mesh = primitive_mesh(("CUBOID", *shape, limits is not None), build)
+        else:
+            mesh = build(name)
+        bpy_object = bpy.data.objects.new(name, mesh)
         if limits is not None:
-            # shift origin to corner
-            for vertex in bpy_object.data.vertices:
-                for i in range(3):
-                    vertex.co[i] += shape[i] * 0.5
             bpy_object.location = tuple(lim[0] for lim in limits)
 
-        super().__init__(bpy_object)
+        super().__init__(bpy_object, lightweight=lightweight)
 
 
 class Cube(Cuboid):
-    def __init__(self, edge_length=1, name="cube"):
-        super().__init__(shape=[edge_length] * 3, name=name)
+    __slots__ = ()
 
+    def __init__(self, edge_length=1, name="cube", cached=True, lightweight=None):
+        super().__init__(shape=[edge_length] * 3, name=name, cached=cached, lightweight=lightweight)
 
-class UVSphere(MeshObject):
-    def __init__(self, u_segments=32, v_segments=16, radius=0.5, name="uv_sphere"):
+
+def _build_uv_sphere(u_segments, v_segments, radius, smooth):
+    def build(name):
         mesh = bpy.data.meshes.new(name)
-        bpy_object = bpy.data.objects.new(name, mesh)
         bm = bmesh.new()
         bmesh.ops.create_uvsphere(bm, u_segments=u_segments, v_segments=v_segments, radius=radius)
         bm.to_mesh(mesh)
         bm.free()
-        super().__init__(bpy_object)
+        mesh.polygons.foreach_set("use_smooth", np.full(len(mesh.polygons), smooth, dtype=bool))
+        return mesh
+    return build
+
+
+class UVSphere(MeshObject):
+    __slots__ = ()
+
+    def __init__(self, u_segments=None, v_segments=None, radius=0.5, name="uv_sphere", smooth=False, cached=True,
+                 location=None, lightweight=None):
+        """
+        Args:
+            u_segments: If None, chosen by the detail policy (see detail.DetailPolicy.sphere_segments)
+            v_segments: If None, chosen by the detail policy
+            radius:
+            name:
+            smooth: shade smooth
+            cached: share the mesh with all spheres with the same parameters (see primitive_mesh)
+            location: location of the sphere. Also used by detail policies that take the camera distance into account.
+            lightweight: see HighLevelObject
+        """
+        if u_segments is None or v_segments is None:
+            adaptive_u_segments, adaptive_v_segments = detail.default_policy.sphere_segments(radius, location)
+            u_segments = adaptive_u_segments if u_segments is None else u_segments
+            v_segments = adaptive_v_segments if v_segments is None else v_segments
+        build = _build_uv_sphere(u_segments, v_segments, radius, smooth)
+        if cached:
+            mesh = primitive_mesh(("UV_SPHERE", u_segments, v_segments, float(radius), smooth), build)
+        else:
+            mesh = build(name)
+        bpy_object = bpy.data.objects.new(name, mesh)
+        if location is not None:
+            bpy_object.location = location
+        super().__init__(bpy_object, lightweight=lightweight)
@@ -27,8 +27,9 @@ class Axis(Empty):
         elif axis_style == "BAR":
             self.axis_object = Cuboid(axis_shape, name="axis_bar")
             self.axis_object.parent = self
-            for vertex in self.axis_object.bpy_object.data.vertices:
-                vertex.co[dim] += 0.5 * length - 0.5 * width
+            vertices = self.axis_object.vertices
+            vertices[:, dim] += 0.5 * length - 0.5 * width
+            self.axis_object.vertices = vertices
         elif not axis_style:
             self.axis_object = None
         else:
@@ -100,7 +101,7 @@ class Axis(Empty):
             self.label.location = [self.length / 2, -offset, 0]
         elif self.dim == 1:
             self.label.location = [-offset, self.length / 2, 0]
-            self.label.rotation_euler[2] = pi / 2
+            self.label.rotation_euler = (0, 0, pi / 2)
         elif self.dim == 2:
             self.label.location = [-offset, 0, self.length / 2]
         return self.label
\ No newline at end of file
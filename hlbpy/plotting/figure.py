@@ -43,6 +43,12 @@ class Figure(Empty):
         data = data / (self.extent[:, 1] - self.extent[:, 0]) * self.shape_3d
         return data
 
+    def data_to_global(self, data):
+        """
+        Convert data coordinates of shape (n_points, 3) into global space e.g. to place labels next to data points.
+        """
+        return self.to_global(self.transform_to_extent(np.asarray(data, dtype=float)))
+
 
 
     # @property
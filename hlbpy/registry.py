@@ -0,0 +1,62 @@
+import weakref
+
+# (pointer, session_uid) of a bpy datablock -> its high level wrapper
+# Wrappers are only referenced weakly, so the registry does not keep any wrapper alive.
+_wrappers = weakref.WeakValueDictionary()
+# keys of the datablocks hlbpy created in this session, as opposed to wrapped existing ones
+_created = set()
+
+
+def datablock_key(datablock):
+    """
+    Identifies a datablock. The session_uid makes sure a pointer that is reused after a datablock was removed
+    is not mistaken for the removed datablock.
+    """
+    return datablock.as_pointer(), getattr(datablock, "session_uid", None)
+
+
+def register(wrapper):
+    """
+    Remember the high level wrapper of wrapper.bpy_object. A previous wrapper of the same datablock is replaced.
+    """
+    _wrappers[datablock_key(wrapper.bpy_object)] = wrapper
+
+
+def unregister(wrapper):
+    key = datablock_key(wrapper.bpy_object)
+    if _wrappers.get(key) is wrapper:
+        del _wrappers[key]
+
+
+def mark_created(datablock):
+    """
+    Remember that hlbpy created the datablock (see deletion.delete_all).
+    """
+    _created.add(datablock_key(datablock))
+
+
+def forget_created(datablock):
+    _created.discard(datablock_key(datablock))
+
+
+def was_created(datablock):
+    return datablock_key(datablock) in _created
+
+
+def lookup(datablock):
+    """
+    Returns the high level wrapper of a bpy datablock or None.
+    """
+    return _wrappers.get(datablock_key(datablock))
+
+
+def lookup_name(name, bpy_collection):
+    """
+    Returns the high level wrapper of the datablock with the given name in e.g. bpy.data.objects or None.
+    """
+    datablock = bpy_collection.get(name)
+    return None if datablock is None else lookup(datablock)
+
+
+def n_wrappers():
+    return len(_wrappers)
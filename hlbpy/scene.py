@@ -5,9 +5,9 @@ from .base import HighLevelBase
 class Scene(HighLevelBase):
     def __init__(self, name=None, activate=True, bpy_object=None, reuse=True):
         if bpy_object is None:
-            already_present = name in [s.name for s in bpy.data.scenes]
-            if already_present and reuse:
-                self.bpy_object = bpy.data.scenes[name]
+            present = bpy.data.scenes.get(name)
+            if present is not None and reuse:
+                self.bpy_object = present
             else:
                 self.bpy_object = bpy.data.scenes.new(name)
         else:
@@ -16,9 +16,7 @@ class Scene(HighLevelBase):
             bpy.context.window.scene = self.bpy_object
 
     def link(self, collection):
-        try:
-            self.bpy_object.collection.children[collection.bpy_object.name]
-        except KeyError:
+        if self.bpy_object.collection.children.get(collection.bpy_object.name) is None:
             self.bpy_object.collection.children.link(collection.bpy_object)
         return collection
 
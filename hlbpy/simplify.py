@@ -0,0 +1,96 @@
+import numpy as np
+
+
+def bernstein(u):
+    """
+    Cubic bernstein polynomials. Returns an array of shape (4, len(u)).
+    """
+    v = 1 - u
+    return np.stack((v ** 3, 3 * u * v ** 2, 3 * u ** 2 * v, u ** 3))
+
+
+def _fit_segments(frames, values, key_indices, regularization=1e-9):
+    """
+    Least squares fit of one cubic bezier segment between every pair of neighbouring keys.
+    The x coordinates of the control points are fixed at 1/3 and 2/3 of each segment,
+    so the bezier x(u) is linear in u and the segments can be fitted with a 2x2 linear system each.
+
+    Returns:
+        inner control point values p1, p2 of shape (n_segments,) each and the absolute error of every sample
+    """
+    n_segments = len(key_indices) - 1
+    segment = np.clip(np.searchsorted(key_indices, np.arange(len(values)), side="right") - 1, 0, n_segments - 1)
+    t0 = frames[key_indices[:-1]]
+    t1 = frames[key_indices[1:]]
+    y0 = values[key_indices[:-1]]
+    y1 = values[key_indices[1:]]
+
+    u = (frames - t0[segment]) / (t1 - t0)[segment]
+    b0, b1, b2, b3 = bernstein(u)
+    residual = values - b0 * y0[segment] - b3 * y1[segment]
+
+    # regularize towards the straight line so segments with less than two inner samples stay solvable
+    linear_p1 = y0 + (y1 - y0) / 3
+    linear_p2 = y0 + (y1 - y0) * 2 / 3
+    a11 = np.bincount(segment, b1 * b1, n_segments) + regularization
+    a12 = np.bincount(segment, b1 * b2, n_segments)
+    a22 = np.bincount(segment, b2 * b2, n_segments) + regularization
+    r1 = np.bincount(segment, b1 * residual, n_segments) + regularization * linear_p1
+    r2 = np.bincount(segment, b2 * residual, n_segments) + regularization * linear_p2
+    determinant = a11 * a22 - a12 * a12
+    p1 = (a22 * r1 - a12 * r2) / determinant
+    p2 = (a11 * r2 - a12 * r1) / determinant
+
+    fitted = b0 * y0[segment] + b1 * p1[segment] + b2 * p2[segment] + b3 * y1[segment]
+    return p1, p2, np.abs(fitted - values)
+
+
+def fit_bezier_keyframes(frame_numbers, values, tolerance):
+    """
+    Approximate densely sampled values with as few bezier keyframes as possible.
+    Starting with the first and last sample as keys, every segment whose fit deviates more than tolerance from the
+    samples is split at its worst sample (like Ramer-Douglas-Peucker but with a cubic instead of a linear fit).
+    All segments are fitted at once in every iteration.
+    Args:
+        frame_numbers: strictly increasing frame numbers of shape (n_samples,)
+        values: sample values of shape (n_samples,)
+        tolerance: maximal absolute deviation from any sample
+
+    Returns:
+        key_frames, key_values, handles_left, handles_right
+        handles are relative to the keyframe coordinate and have the shape (n_keys, 2)
+    """
+    frames = np.asarray(frame_numbers, dtype=float)
+    values = np.asarray(values, dtype=float)
+    if len(values) < 3:
+        key_indices = np.arange(len(values))
+        p1 = values[:-1] + (values[1:] - values[:-1]) / 3
+        p2 = values[:-1] + (values[1:] - values[:-1]) * 2 / 3
+    else:
+        key_indices = np.array([0, len(values) - 1])
+        while True:
+            p1, p2, error = _fit_segments(frames, values, key_indices)
+            segment_starts = key_indices[:-1]
+            max_error = np.maximum.reduceat(error, segment_starts)
+            to_split = max_error > tolerance
+            if not np.any(to_split):
+                break
+            segment = np.searchsorted(key_indices, np.arange(len(values)), side="right") - 1
+            worst = np.lexsort((-error, segment))
+            first_of_segment = np.searchsorted(segment[worst], np.arange(len(segment_starts)))
+            split_indices = worst[first_of_segment[to_split]]
+            key_indices = np.union1d(key_indices, split_indices)
+
+    key_frames = frames[key_indices]
+    key_values = values[key_indices]
+    segment_length = np.diff(key_frames)
+    handles_left = np.zeros((len(key_indices), 2))
+    handles_right = np.zeros((len(key_indices), 2))
+    handles_right[:-1, 0] = segment_length / 3
+    handles_right[:-1, 1] = p1 - key_values[:-1]
+    handles_left[1:, 0] = -segment_length / 3
+    handles_left[1:, 1] = p2 - key_values[1:]
+    if len(key_indices) > 1:
+        handles_left[0] = -handles_right[0]
+        handles_right[-1] = -handles_left[-1]
+    return key_frames, key_values, handles_left, handles_right
@@ -1,5 +1,5 @@
 import bpy
-from .base_object import HighLevelObject
+from .base_object import HighLevelObject, get_transforms, set_transforms, reparent
 from .curve import Curve, TipTriangle, Rectangle
 from .io_curve_svg.import_svg import SVGLoader
 from .external.tex import tex_to_svg_file
@@ -7,22 +7,42 @@ from .external.tex import get_modified_expression
 from .directions import *
 from .empty import Empty
 from .material import PrincipledBSDF
+from .deletion import delete_objects
 import tempfile
 import numpy as np
 from mathutils import Vector
 
 
 class ParentGroup(HighLevelObject):
+    __slots__ = ()
+
     def __init__(self, children, name="ParentGroup", bpy_object=None):
         if bpy_object is None:
             bpy_object = bpy.data.objects.new(name, None)
         super().__init__(bpy_object)
-        for child in children:
-            child.parent = self
+        reparent(children, self)
 
     def get_bound(self, direction):
         return self.get_children_bound(direction)
 
+    def get_box(self, in_global_space=False):
+        return self.get_children_box(in_global_space)
+
+    def get_animated_bound(self, direction, frames, in_global_space=False):
+        return self.get_animated_children_bound(direction, frames, in_global_space)
+
+    def get_children_transforms(self):
+        """
+        Returns locations, rotations (euler angles) and scales of the children as arrays of shape (n_children, 3) each.
+        """
+        return get_transforms(self.children)
+
+    def set_children_transforms(self, locations=None, rotations=None, scales=None):
+        """
+        Set the transforms of all children at once with a single update (see Collection.set_transforms).
+        """
+        set_transforms(self.children, locations, rotations, scales)
+
 
 class SVG(ParentGroup):
     def __init__(self, file_path, name="SVG"):
@@ -54,11 +74,12 @@ class Tex(SVG):
         else:
             super().__init__(None, name)
 
-        for child in self.bpy_object.children:
+        for child in self:
             child.scale = [scale] * 3
         self.set_recursively("material", PrincipledBSDF(name=name + "Mat"))
-        self.update()
         self.align_children(CENTER)
+        for child in self:
+            child.adapt_resolution()
 
     def transform(self, target, start, stop=None, n_frames=30, target_indices=None, adjust_spline_number=True,
                   blend_offset=0):
@@ -103,8 +124,7 @@ class Tex(SVG):
             for _ in range(1, factor):
                 new_children.append(child.copy())
 
-        for child in new_children:
-            child.parent = to_extend
+        reparent(new_children, to_extend)
 
 
 class MathTex(ParentGroup):
@@ -119,10 +139,8 @@ class MathTex(ParentGroup):
                 subobject = Tex(tex_string, environment="align*", scale=scale)
 
                 end = begin + len(subobject)
-                for obj in list(subobject.children):
-                    obj.delete()
-                for i in range(begin, end):
-                    full_tex.children[0].parent = subobject
+                delete_objects(list(subobject.children))
+                reparent(full_tex.children[:end - begin], subobject)
                 subobjects.append(subobject)
                 begin = end
             full_tex.delete()
@@ -162,17 +180,17 @@ class MathTex(ParentGroup):
 
 
 class Arrow(Curve):
-    def __init__(self, coordinates, line_width, tip_width, tip_length, thickness, name="Arrow"):
+    def __init__(self, coordinates, line_width, tip_width, tip_length, thickness, name="Arrow", lightweight=None):
         coordinates = np.array(coordinates, dtype=float)
         tip_direction = coordinates[-1] - coordinates[-2]
         tip_direction = tip_direction / np.linalg.norm(tip_direction)
         coordinates[-1] -= tip_direction * tip_length  # making space for the tip
 
-        super().__init__(coordinates, spline_type="NURBS", name=name)
+        super().__init__(coordinates, spline_type="NURBS", name=name, lightweight=lightweight)
 
-        self.bevel_object = Rectangle(line_width, thickness)
+        self.bevel_object = Rectangle(line_width, thickness, lightweight=lightweight)
 
-        self.tip = TipTriangle(tip_width, tip_length, thickness)
+        self.tip = TipTriangle(tip_width, tip_length, thickness, lightweight=lightweight)
         self.tip.parent = self
         self.tip.location = coordinates[-1]
         self.tip.rotation_euler = Vector([0, 1, 0]).rotation_difference(Vector(tip_direction)).to_euler()
@@ -0,0 +1,48 @@
+import numpy as np
+import pytest
+
+bpy = pytest.importorskip("bpy")
+
+from hlbpy import keyframes
+from hlbpy.evaluation import evaluate_fcurve
+
+
+def new_fcurve(keys):
+    action = bpy.data.actions.new("test_evaluation")
+    fcurve = action.fcurves.new("location", index=0)
+    keyframes.write_keyframes(fcurve, keys)
+    return fcurve
+
+
+def blender_values(fcurve, frames):
+    return np.array([fcurve.evaluate(frame) for frame in frames])
+
+
+def test_overshooting_free_handles():
+    keys = keyframes.build_keyframes([0, 10, 20], [0, 1, 0], "BEZIER", handles_left=[[-15, 3]] * 3,
+                                     handles_right=[[12, 5]] * 3)
+    fcurve = new_fcurve(keys)
+    frames = np.linspace(-5, 25, 121)
+    np.testing.assert_allclose(evaluate_fcurve(fcurve, frames), blender_values(fcurve, frames), atol=1e-3)
+
+
+@pytest.mark.parametrize("seed", range(5))
+@pytest.mark.parametrize("extrapolation", ["CONSTANT", "LINEAR"])
+def test_random_keyframes(seed, extrapolation):
+    rng = np.random.default_rng(seed)
+    n = 20
+    frames = np.cumsum(rng.uniform(1, 10, n))
+    values = rng.normal(0, 5, n)
+    interpolation = rng.choice(["CONSTANT", "LINEAR", "BEZIER"], n)
+    handle_types = rng.choice(["FREE", "AUTO_CLAMPED"], n)
+    keys = keyframes.build_keyframes(frames, values, interpolation, handles_left=rng.normal(0, 6, (n, 2)),
+                                     handles_right=rng.normal(0, 6, (n, 2)), handle_left_type=handle_types,
+                                     handle_right_type=handle_types)
+    fcurve = new_fcurve(keys)
+    fcurve.extrapolation = extrapolation
+
+    # the frames of the keyframes themselves as stored by blender (float32)
+    key_frames = keyframes.read_keyframes(fcurve)["co"][:, 0].astype(float)
+    sample_frames = np.concatenate((np.linspace(frames[0] - 10, frames[-1] + 10, 500), key_frames))
+    np.testing.assert_allclose(evaluate_fcurve(fcurve, sample_frames), blender_values(fcurve, sample_frames),
+                               atol=2e-3)